@@ -33,8 +33,27 @@ app.config['DATABASE'] = os.environ.get('DATABASE_PATH', 'kursstudio.db')
 app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER', 'uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# PERFORMANCE: orjson für das SocketIO-Encoding (viele kleine Workflow-Events), Fallback auf Standard-JSON
+try:
+    import orjson
+
+    class _OrjsonSocketIOJSON:
+        """json-kompatibler Adapter für python-socketio (zusätzliche dumps-Argumente werden ignoriert)"""
+
+        @staticmethod
+        def dumps(obj, *args, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+        @staticmethod
+        def loads(data, *args, **kwargs):
+            return orjson.loads(data)
+
+    _socketio_json_options = {'json': _OrjsonSocketIOJSON}
+except ImportError:
+    _socketio_json_options = {}
+
 # SocketIO konfigurieren
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', **_socketio_json_options)
 
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO)
@@ -148,6 +167,22 @@ class DatabaseManager:
                 cursor.execute('ALTER TABLE uploaded_files ADD COLUMN doc_id TEXT')
                 logger.info("Added doc_id column to uploaded_files table")
             
+            if 'content_hash' not in cols:
+                cursor.execute('ALTER TABLE uploaded_files ADD COLUMN content_hash VARCHAR(32)')
+                logger.info("Added content_hash column to uploaded_files table")
+            
+            # Upload-Deduplizierung: Lookup nach (project_id, content_hash)
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_uploaded_files_content_hash
+                ON uploaded_files (project_id, content_hash)
+            ''')
+            
+            # Wissensbasis-Übersicht: Filter auf project_id/processed, sortiert nach created_at
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_uploaded_project_processed
+                ON uploaded_files (project_id, processed, created_at DESC)
+            ''')
+            
             # Assistants Tabelle - FLEXIBLE ASSISTANT-VERWALTUNG
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS assistants (
@@ -1073,6 +1108,14 @@ def _schedule_memory_cleanup():
     except Exception as e:
         logger.error(f"❌ Memory cleanup error: {e}")
 
+def _invalidate_assistants_cache():
+    """Verwirft den Assistant-Cache der Orchestrators nach Änderungen an Assistants"""
+    try:
+        from chat_orchestrator import DynamicChatOrchestrator
+        DynamicChatOrchestrator.invalidate_assistants_cache()
+    except Exception as e:
+        logger.error(f"❌ Assistant cache invalidation error: {e}")
+
 # Database-Initialisierung und Scheduler-Start
 def init_database():
     """Initialisiert Datenbank und startet Background-Services"""
@@ -1242,6 +1285,7 @@ def api_assistants():
                 # Tool Configuration
                 enabled_tools=json.loads(data.get('enabled_tools', '["create_content","optimize_didactics","critically_review","request_user_feedback","knowledge_lookup"]'))
             )
+            _invalidate_assistants_cache()
             new_assistant = db.get_assistant_by_id(assistant_id)
             return jsonify(new_assistant), 201
 
@@ -1293,6 +1337,7 @@ def api_assistant_detail(assistant_id):
                 enabled_tools=data.get('enabled_tools', assistant.get('enabled_tools', '["create_content","optimize_didactics","critically_review","request_user_feedback","knowledge_lookup"]'))
             )
             if success:
+                _invalidate_assistants_cache()
                 updated_assistant = db.get_assistant_by_id(assistant_id)
                 return jsonify(updated_assistant)
             return jsonify({'error': 'Update fehlgeschlagen'}), 500
@@ -1304,6 +1349,7 @@ def api_assistant_detail(assistant_id):
         try:
             success = db.delete_assistant(assistant_id)
             if success:
+                _invalidate_assistants_cache()
                 return jsonify({'message': 'Assistant erfolgreich gelöscht'}), 200
             return jsonify({'error': 'Löschen fehlgeschlagen'}), 500
         except Exception as e:
@@ -1317,6 +1363,7 @@ def toggle_assistant(assistant_id):
     try:
         success = db.toggle_assistant_status(assistant_id)
         if success:
+            _invalidate_assistants_cache()
             return jsonify({'message': 'Assistant-Status erfolgreich geändert'})
         return jsonify({'error': 'Assistant nicht gefunden'}), 404
     except Exception as e:
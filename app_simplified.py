@@ -9,10 +9,12 @@ import os
 import logging
 from datetime import datetime
 from typing import Dict, Optional, Any
+from urllib.parse import urlparse
 
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import deferred, undefer
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
@@ -33,6 +35,28 @@ if database_url.startswith('postgres://'):
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# PERFORMANCE: Expliziter Connection-Pool für PostgreSQL (SQLite behält die Flask-SQLAlchemy-Defaults).
+# Hinter PgBouncer (Port 6432 oder DATABASE_POOLER=pgbouncer): kein Pre-Ping (erzeugt "idle in transaction"
+# im Transaction-Pooling), kurzes Recycling, keine Startup-Options (von PgBouncer abgelehnt).
+# Direktverbindung: Pre-Ping gegen abgerissene Verbindungen, Recycling nach 30 Minuten, Statement-Timeout.
+if database_url.startswith('postgresql://'):
+    behind_pgbouncer = (urlparse(database_url).port == 6432
+                        or os.environ.get('DATABASE_POOLER', '').lower() == 'pgbouncer')
+    engine_options = {
+        # Größerer Cache für kompilierte Statements (Default 500) - Hot-Path-Queries werden nicht neu kompiliert
+        'query_cache_size': 2000,
+        'pool_size': 10,
+        'max_overflow': 5,
+        'pool_timeout': 30,
+        'isolation_level': 'READ COMMITTED',
+    }
+    if behind_pgbouncer:
+        engine_options.update(pool_pre_ping=False, pool_recycle=60)
+    else:
+        engine_options.update(pool_pre_ping=True, pool_recycle=1800,
+                              connect_args={'options': '-c statement_timeout=30000'})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options
+
 # Initialize extensions
 db = SQLAlchemy(app)
 socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
@@ -96,7 +120,7 @@ class Course(db.Model):
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'))
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    full_content = db.Column(db.Text)
+    full_content = deferred(db.Column(db.Text))  # PERFORMANCE: Kursliste lädt den Volltext nicht mit
     quality_score = db.Column(db.Float)
     content_length = db.Column(db.Integer)
     status = db.Column(db.String(20), default='draft')
@@ -254,7 +278,7 @@ def courses():
 def view_course(course_id):
     """View a specific course"""
     try:
-        course = Course.query.get_or_404(course_id)
+        course = Course.query.options(undefer(Course.full_content)).get_or_404(course_id)
         return render_template('course_view.html', course=course)
     except Exception as e:
         logger.error(f"Error loading course {course_id}: {e}")
@@ -265,7 +289,7 @@ def view_course(course_id):
 def download_course(course_id):
     """Download course as text file"""
     try:
-        course = Course.query.get_or_404(course_id)
+        course = Course.query.options(undefer(Course.full_content)).get_or_404(course_id)
         
         from flask import Response
         
@@ -382,7 +406,12 @@ def handle_join_project(data):
     
     # Load chat history
     try:
-        messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.created_at.asc()).limit(50).all()
+        messages = db.session.scalars(
+            db.select(ChatMessage)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.asc())
+            .limit(50)
+        ).all()
         
         for msg in messages:
             emit('new_message', {
@@ -11,127 +11,793 @@ NEUE FEATURES:
 """
 
 import os
+import sys
 import json
 import time
 import sqlite3
 import threading
-import gc
 import logging
 import base64
 import re
+import heapq
+import itertools
+import queue
+import hashlib
+import random
+import io
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any, List
+from operator import itemgetter
+from types import MappingProxyType, SimpleNamespace
+from typing import Dict, Optional, Any, List, Mapping, Tuple
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AssistantEventHandler, BadRequestError, DefaultHttpxClient
 from dotenv import load_dotenv
 from quality_assessment import assess_course_quality
 
+# Datenbank-Verfügbarkeit einmalig beim Import prüfen (ohne models direkt in den Fallback)
+try:
+    import models as _models  # noqa: F401
+    _HAS_DB = True
+except Exception:
+    _HAS_DB = False
+
+# PERFORMANCE: orjson (C-Extension) für schnelles JSON-Parsing, Fallback auf stdlib json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# PERFORMANCE: pybase64 (SIMD-Backend) für große Kursinhalte, Fallback auf stdlib base64
+try:
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+_BASE64_PREFIX = "BASE64:"
+
 # .env-Datei laden
 load_dotenv()
 
+# HTTP/2 nur, wenn das optionale h2-Paket installiert ist (sonst HTTP/1.1 mit Keep-Alive)
+try:
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+# Global orchestrator instance für Web-App Integration mit Cleanup-System
+# Keys sind (project_id, session_id)-Tupel
+active_orchestrators: Dict[Tuple[str, str], 'DynamicChatOrchestrator'] = {}
+orchestrator_last_activity: Dict[Tuple[str, str], datetime] = {}
+# THREAD SAFETY: Schützt beide Registry-Dicts (nur kurze Dict-Operationen, nie Orchestrator-Konstruktion)
+_orchestrators_lock = threading.Lock()
+
+# Memory Management Konfiguration
+ORCHESTRATOR_TTL_MINUTES = 30  # Time-to-live für inaktive Orchestrators
+MAX_CONCURRENT_ORCHESTRATORS = 50  # Maximum gleichzeitige Orchestrators
+CLEANUP_INTERVAL_MINUTES = 10  # Cleanup-Interval
+ASSISTANTS_CACHE_TTL_SECONDS = 60  # Time-to-live für den Assistant-DB-Cache
+
+# Run-Monitoring Konfiguration
+MONITOR_POOL_MAX_WORKERS = 16  # Maximale Anzahl paralleler Run-Monitore
+POLL_INTERVAL_MIN_SECONDS = 0.5  # Erstes Poll-Intervall nach Statuswechsel
+POLL_INTERVAL_MAX_SECONDS = 4.0  # Obergrenze für das Poll-Intervall
+POLL_BACKOFF_FACTOR = 1.5  # Multiplikator pro Poll ohne Statuswechsel
+POLL_JITTER_SECONDS = 0.25  # Zufälliger Zuschlag gegen synchrone Polls vieler Sessions
+EMIT_QUEUE_MAX_SIZE = 1024  # Gepufferte SocketIO-Events pro Orchestrator
+EMIT_QUEUE_PUT_TIMEOUT_SECONDS = 5  # Max. Wartezeit für nicht verwerfbare Events bei voller Queue
+EMIT_COALESCE_SECONDS = 0.02  # Zeitfenster, in dem Events für denselben Raum gebündelt werden
+EMIT_BATCH_MAX_SIZE = 50  # Maximale Anzahl Events pro 'batch'-Emit
+COURSE_CONTENT_CHUNK_CHARS = 65536  # Kursinhalt wird in Teilstücken dieser Größe gesendet
+TOOL_CALL_MAX_WORKERS = 8  # Parallel ausgeführte Tool-Calls pro Run
+TOOL_OUTPUT_MAX_CHARS = 3000  # Tool-Outputs an OpenAI werden darüber hinaus gekürzt
+AGENT_TOKEN_FLUSH_CHUNKS = 8  # Token-Deltas pro 'agent_token'-Emit
+AGENT_TOKEN_FLUSH_SECONDS = 0.1  # Spätestens nach X Sekunden gesammelte Deltas senden
+_POLL_DONE = 'done'  # Polling-Handler: Monitoring beenden
+_POLL_NOW = 'poll_now'  # Polling-Handler: ohne Wartezeit erneut abfragen
+RECOVERY_CREATE_ATTEMPTS = 5  # Versuche für runs.create, solange der alte Run noch aktiv ist
+RECOVERY_RETRY_MIN_SECONDS = 0.2  # Erste Pause zwischen den Versuchen (verdoppelt sich)
+RUN_STUCK_SECONDS = 12  # Gleicher Status (queued/in_progress) länger als X Sekunden = hängt
+RUN_QUEUED_TIMEOUT_SECONDS = 30  # Maximale Wartezeit in der Queue
+
+# Connection-Pool des OpenAI Clients (wird von allen Sessions geteilt)
+# Obergrenze: je Orchestrator ein Supervisor-Stream plus parallele Tool-Calls, dazu die Run-Monitore
+OPENAI_HTTP_MAX_CONNECTIONS = MAX_CONCURRENT_ORCHESTRATORS * (TOOL_CALL_MAX_WORKERS + 1) + MONITOR_POOL_MAX_WORKERS
+OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS = 20
+OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS = 120.0
+OPENAI_HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+OPENAI_HTTP_READ_TIMEOUT_SECONDS = 600.0  # Lang genug für SSE-Streams ohne Zwischen-Events
+OPENAI_HTTP_POOL_TIMEOUT_SECONDS = 10.0  # Max. Wartezeit auf eine freie Verbindung (danach Timeout + SDK-Retry)
+
 # OpenAI Client initialisieren (Singleton Pattern)
 _openai_client = None
+_openai_client_lock = threading.Lock()
 
 def get_openai_client() -> OpenAI:
     """Singleton Pattern für OpenAI Client - verhindert Memory-Leak durch zu viele Instanzen"""
     global _openai_client
     if _openai_client is None:
-        _openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        with _openai_client_lock:
+            if _openai_client is None:
+                # PERFORMANCE: Ein httpx-Client mit großem Keep-Alive-Pool, damit Polls, Tool-Submits
+                # und Streams bestehende TLS-Verbindungen wiederverwenden (DefaultHttpxClient behält die SDK-Defaults)
+                http_client = DefaultHttpxClient(
+                    http2=_HTTP2_AVAILABLE,
+                    timeout=httpx.Timeout(OPENAI_HTTP_READ_TIMEOUT_SECONDS, connect=OPENAI_HTTP_CONNECT_TIMEOUT_SECONDS,
+                                          pool=OPENAI_HTTP_POOL_TIMEOUT_SECONDS),
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                        keepalive_expiry=OPENAI_HTTP_KEEPALIVE_EXPIRY_SECONDS
+                    )
+                )
+                _openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client)
     return _openai_client
 
-# Global orchestrator instance für Web-App Integration mit Cleanup-System
-active_orchestrators: Dict[str, 'DynamicChatOrchestrator'] = {}
-orchestrator_last_activity: Dict[str, datetime] = {}
-
-# Memory Management Konfiguration
-ORCHESTRATOR_TTL_MINUTES = 30  # Time-to-live für inaktive Orchestrators
-MAX_CONCURRENT_ORCHESTRATORS = 50  # Maximum gleichzeitige Orchestrators
-CLEANUP_INTERVAL_MINUTES = 10  # Cleanup-Interval
+# PERFORMANCE: Geteilter, begrenzter Thread-Pool für alle Run-Monitore statt ein Thread pro Request
+_monitor_pool = ThreadPoolExecutor(max_workers=MONITOR_POOL_MAX_WORKERS, thread_name_prefix='orch-monitor')
 
 logger = logging.getLogger(__name__)
 
+# INTENT DETECTION: Keyword-Tabellen einmalig als Alternation kompilieren (ein C-Regex-Pass statt N Substring-Scans)
+GREETING_PATTERNS = (
+    'hallo', 'hi', 'hey', 'guten tag', 'guten morgen', 'guten abend',
+    'servus', 'moin', 'hallöchen', 'grüß gott', 'grüß dich'
+)
+SMALL_TALK_PATTERNS = (
+    'wie geht', 'was machst du', 'was kannst du', 'wer bist du',
+    'danke', 'dankeschön', 'vielen dank', 'super', 'toll', 'prima',
+    'ok', 'okay', 'alles klar', 'verstehe', 'gut'
+)
+COURSE_PATTERNS = (
+    'kurs', 'erstell', 'training', 'schulung', 'lerninhalt',
+    'lektion', 'tutorial', 'workshop', 'seminar', 'modul'
+)
+
+# SUPERVISOR: Tool-Definitionen und Instructions (einmalig beim Import aufgebaut)
+SUPERVISOR_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "create_content",
+            "description": "Erstellt einen ersten Rohentwurf für ein gegebenes Thema mit Content Creator Agent.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "topic": {
+                        "type": "string",
+                        "description": "Das Thema, zu dem der Inhalt erstellt werden soll."
+                    },
+                    "instructions": {
+                        "type": "string", 
+                        "description": "Spezifische Anweisungen für die Inhaltserstellung."
+                    },
+                    "content_type": {
+                        "type": "string",
+                        "description": "Der Typ des zu erstellenden Inhalts: 'outline' für Inhaltsverzeichnis oder 'full_content' für vollständigen Inhalt.",
+                        "enum": ["outline", "full_content"]
+                    }
+                },
+                "required": ["topic", "instructions", "content_type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "optimize_didactics",
+            "description": "Optimiert vorhandenen Inhalt didaktisch mit Didactic Expert Agent.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "content": {
+                        "type": "string",
+                        "description": "Der zu optimierende Inhalt."
+                    }
+                },
+                "required": ["content"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "critically_review",
+            "description": "Prüft Inhalt kritisch auf Logik, Fakten und Konsistenz mit Quality Checker Agent.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "content": {
+                        "type": "string",
+                        "description": "Der zu prüfende Inhalt."
+                    },
+                    "review_type": {
+                        "type": "string",
+                        "description": "Der Typ der Prüfung: 'outline' für Inhaltsverzeichnis-Review oder 'full_content' für vollständige Inhaltsprüfung.",
+                        "enum": ["outline", "full_content"]
+                    }
+                },
+                "required": ["content", "review_type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "request_outline_approval",
+            "description": "Zeigt dem User das geprüfte Inhaltsverzeichnis und fragt nach Freigabe für die Volltext-Erstellung. User kann Änderungen vorschlagen.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "outline": {
+                        "type": "string",
+                        "description": "Das detaillierte Inhaltsverzeichnis mit Kapiteln, Lernzielen und groben Beschreibungen."
+                    },
+                    "quality_feedback": {
+                        "type": "string",
+                        "description": "Das Feedback vom Quality Checker zum Outline."
+                    },
+                    "topic": {
+                        "type": "string",
+                        "description": "Das Kursthema."
+                    }
+                },
+                "required": ["outline", "quality_feedback", "topic"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "request_user_feedback", 
+            "description": "Fordert finales Feedback vom User für den vollständig erstellten Kursinhalt.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "content": {
+                        "type": "string",
+                        "description": "Der finale Kursinhalt für den Feedback benötigt wird."
+                    },
+                    "question": {
+                        "type": "string",
+                        "description": "Die spezifische Frage an den User."
+                    },
+                    "stage": {
+                        "type": "string",
+                        "description": "Das Stadium des Workflows (z.B. 'final_approval')."
+                    }
+                },
+                "required": ["content", "question", "stage"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "knowledge_lookup",
+            "description": "Durchsucht die projektspezifische Wissensbasis nach relevanten Informationen.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Die Suchanfrage für die Wissensbasis."
+                    },
+                    "context": {
+                        "type": "string",
+                        "description": "Zusätzlicher Kontext für die Suche."
+                    }
+                },
+                "required": ["query"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "execute_workflow",
+            "description": "Führt einen benutzerdefinierten Workflow mit konfigurierten Assistants aus.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "workflow_id": {
+                        "type": "integer",
+                        "description": "Die ID des auszuführenden Workflows."
+                    },
+                    "input_content": {
+                        "type": "string",
+                        "description": "Der Eingabeinhalt für den Workflow (z.B. Kursthema)."
+                    }
+                },
+                "required": ["workflow_id", "input_content"]
+            }
+        }
+    }
+]
+
+SUPERVISOR_INSTRUCTIONS = """Du bist ein intelligenter KI-Supervisor für automatische Kurserstellung.
+
+DEINE AUFGABE: Erkenne die Nutzerintention und handle entsprechend:
+
+🎯 BEI EXPLIZITEN KURSANFRAGEN:
+Wenn der User eindeutig einen Kurs erstellen möchte (erkennbar an Wörtern wie "Kurs", "erstelle", "Training", "Schulung", "Lerninhalt"):
+
+Führe automatisch diese 3 Schritte aus:
+1. create_content(topic="[Thema]", instructions="Erstelle einen professionellen Kurs")
+2. optimize_didactics(content="[Ergebnis von Schritt 1]")  
+3. critically_review(content="[Ergebnis von Schritt 2]")
+
+WICHTIG für Kurserstellung:
+- Führe ALLE 3 Schritte automatisch aus
+- Verwende die Tool-Outputs direkt weiter
+- Frage NICHT nach Bestätigung zwischen den Schritten
+- Nach Schritt 3 sagst du: "Kurs wurde erfolgreich erstellt!"
+
+💬 BEI ANDEREN ANFRAGEN:
+- Allgemeine Fragen: Beantworte freundlich und kompetent
+- Unklare Themen: Stelle Rückfragen ("Zu welchem Thema soll der Kurs erstellt werden?")
+- Begrüßungen: Antworte höflich und erkläre deine Fähigkeiten
+
+BEISPIELE:
+✅ "Erstelle einen Kurs über Python" → Starte Workflow
+✅ "Ich brauche ein Training zu Vertrieb" → Starte Workflow  
+❌ "Was kannst du?" → Erkläre Fähigkeiten (KEIN Workflow)
+❌ "Wie funktioniert das?" → Beantworte Frage (KEIN Workflow)
+
+Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
+
+# Vorberechnete Vergleichswerte für den Abgleich mit dem Remote-Assistant
+_REQUIRED_TOOL_NAMES = frozenset(tool["function"]["name"] for tool in SUPERVISOR_TOOLS if tool["type"] == "function")
+_SUPERVISOR_INSTRUCTIONS_HASH = hash(SUPERVISOR_INSTRUCTIONS)
+
+# PROMPT-TEMPLATES für die Sub-Assistants (einmalig angelegt, pro Tool-Call nur noch .format)
+CONTENT_PROMPT_TEMPLATE = """🎯 AUFTRAG: Erstelle einen STRUKTUR-OPTIMIERTEN, hochwertigen Kursentwurf für "{topic}".
+
+📋 QUALITY-REQUIREMENTS (Ziel: >7.5/10 Score):
+
+🏗️ OBLIGATORISCHE STRUKTUR-ELEMENTE:
+✅ Nummerierte Hauptkapitel (1., 2., 3., 4., 5.)
+✅ Klare Unterkapitel mit Nummerierung (1.1, 1.2, etc.)
+✅ Maximal 3 Hierarchie-Ebenen
+✅ Logische Progression: Grundlagen → Anwendung → Vertiefung
+
+📚 LERNZIELE (OBLIGATORISCH für Score >5.0):
+✅ 3-5 konkrete Lernziele pro Hauptkapitel
+✅ Format: "Nach diesem Kapitel können Sie..."
+✅ Messbare, spezifische Outcomes
+✅ SMART-Kriterien befolgen
+
+🎓 DIDAKTISCHE STRUKTUR:
+✅ Einführung mit Motivation und Überblick
+✅ Jeder Abschnitt: Ziel → Inhalt → Beispiel → Checkpoint
+✅ Mindestens 1 praktisches Beispiel pro Hauptkonzept  
+✅ Kurze Zusammenfassung am Ende jedes Kapitels
+✅ Wissencheck-Fragen nach jedem Hauptkapitel
+
+📝 CONTENT-STANDARDS:
+✅ Deutsche Sprache, professionelle Tonalität
+✅ Konsistente Terminologie (Glossar-ready)
+✅ Verständlich für Einsteiger bis Fortgeschrittene
+✅ Actionable Content mit klaren Handlungsempfehlungen
+
+🔍 QUALITÄTS-CHECKPOINTS:
+✅ Jeder Abschnitt <500 Wörter für bessere Lesbarkeit
+✅ Bullet Points für komplexe Listen
+✅ Hervorhebungen für Schlüsselbegriffe
+✅ Call-to-Action am Ende jedes Abschnitts
+
+ADDITIONAL INSTRUCTIONS:
+{instructions}
+
+⚡ WICHTIG: Nutze knowledge_lookup ZUERST bei hochgeladenen Dateien für domain-spezifisches Wissen!
+
+🎯 ERFOLGSKRITERIUM: Struktur-Score >8.0, Didaktik-Score >7.0, Gesamt-Score >7.5"""
+
+DIDACTIC_PROMPT_TEMPLATE = """🎓 DIDAKTISCHE OPTIMIERUNG: Transformiere den Kurs von 4.0 auf >7.0 Didaktik-Score!
+
+EINGANGSMATERIAL:
+{content}
+
+🚀 OPTIMIERUNGS-ZIELE (Score-Verbesserung):
+
+📚 LERNZIEL-OPTIMIERUNG (Struktur-Boost):
+✅ Prüfe: Sind 3-5 Lernziele pro Kapitel vorhanden?
+✅ Erweitere fehlende Lernziele im Format: "Nach diesem Kapitel können Sie..."
+✅ Konkretisiere vage Ziele zu messbaren Outcomes
+✅ Verknüpfe Lernziele mit praktischen Anwendungen
+
+🔍 BEISPIEL-INTEGRATION (Didaktik-Boost):
+✅ MINIMUM: 2 konkrete Beispiele pro Hauptkonzept
+✅ Mix aus: Real-World Cases, Code-Snippets, Step-by-Step Demos
+✅ Progressiver Schwierigkeitsgrad: Einfach → Komplex
+✅ Direkte Verbindung zu Lernzielen herstellen
+
+📝 ZUSAMMENFASSUNGS-STRUKTUR:
+✅ Kapitel-Zusammenfassung: 3-5 Kernpunkte als Bullet Points
+✅ Lessons Learned: "Das Wichtigste in Kürze"  
+✅ Next Steps: Klare Handlungsempfehlungen
+✅ Checkpoint-Fragen: 2-3 Selbsttest-Fragen
+
+🎯 INTERAKTIVE ELEMENTE:
+✅ Reflexions-Prompts: "Überlegen Sie..." 
+✅ Praxis-Aufgaben: "Probieren Sie aus..."
+✅ Checklisten für komplexe Prozesse
+✅ "Häufige Fehler"-Boxen mit Lösungen
+
+📊 VERSTÄNDLICHKEITS-OPTIMIERUNG:
+✅ Komplexe Begriffe sofort erklären (Glossar-ready)
+✅ Lange Sätze aufteilen (max. 20 Wörter/Satz)
+✅ Fachbegriffe konsistent verwenden
+✅ Logische Übergänge zwischen Abschnitten
+
+🎨 STRUKTUR-VERBESSERUNG:
+✅ Einheitliche Kapitel-Templates verwenden
+✅ Visueller Flow: Intro → Content → Example → Summary → Action
+✅ Konsistente Formatierung und Hervorhebungen
+✅ Klare Hierarchie beibehalten
+
+🎯 ERFOLGSKRITERIUM: Didaktik-Score von 4.0 auf >7.0 steigern durch systematische Verbesserung aller Dimensionen!"""
+
+QUALITY_IMPROVEMENT_PROMPT_TEMPLATE = """🔍 QUALITÄTS-VERBESSERUNG: Korrigiere den Kurs basierend auf spezifischem Feedback!
+
+URSPRÜNGLICHER KURS:
+{content}
+
+VERBESSERUNGS-ANWEISUNGEN:
+{feedback}
+
+⚡ DEINE AUFGABE:
+Korrigiere den Kurs systematisch basierend auf dem Feedback und gib den VOLLSTÄNDIGEN, VERBESSERTEN KURS aus.
+
+🎯 WICHTIG: 
+- Gib NUR den korrigierten Kursinhalt aus
+- KEIN JSON, keine Bewertung, keine Analyse
+- Vollständiger Kurs mit allen Verbesserungen
+- Alle Probleme behoben gemäß Feedback
+
+AUSGABE: Der komplette, verbesserte Kurs in Markdown-Format."""
+
+QUALITY_REVIEW_PROMPT_TEMPLATE = """🔍 KRITISCHE QUALITÄTSPRÜFUNG: Prüfe und verbessere den Kurs!
+
+ZU PRÜFENDER INHALT:
+{content}
+
+🚨 DEINE AUFGABEN:
+
+1. QUALITÄTS-ANALYSE:
+✅ Struktur prüfen: Lernziele, Hierarchie, Beispiele
+✅ Didaktik bewerten: Verständlichkeit, Progression
+✅ Konsistenz validieren: Terminologie, Sprache
+
+2. SOFORTIGE VERBESSERUNG:
+✅ Fehlende Lernziele ergänzen (3-5 pro Kapitel)
+✅ Beispiele hinzufügen (min. 2 pro Hauptkonzept)
+✅ Terminologie vereinheitlichen
+✅ Sätze verkürzen (max. 20 Wörter)
+✅ Zusammenfassungen ergänzen
+
+⚡ KRITISCH WICHTIG:
+Gib den VOLLSTÄNDIGEN, VERBESSERTEN KURS aus - NICHT das Assessment!
+
+AUSGABE: Der komplette, qualitätssichere Kurs in Markdown-Format mit allen Verbesserungen."""
+
+# Abschlussnachricht nach dem Speichern eines Kurses (pro Kurs nur noch .format)
+COURSE_SAVED_MESSAGE_TEMPLATE = """✅ **Kurs erfolgreich gespeichert!**
+
+**📚 {title}**
+- **Kapitel:** {n_sections}
+- **Umfang:** {content_len:,} Zeichen
+- **Status:** Entwurf
+
+**🔗 Wo finde ich meinen Kurs?**
+➜ [Zu "Meine Kurse"](/courses) - Alle gespeicherten Kurse
+➜ [Diesen Kurs anzeigen](/courses/{course_id}) - Direkt zum Kurs
+
+**📥 Aktionen:**
+- Download als Textdatei
+- In Zwischenablage kopieren
+- Kurs bearbeiten oder veröffentlichen
+
+Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!"""
+
+# Verbesserungs-Anweisungen je Qualitäts-Komponente (Score < 7.0), siehe _generate_improvement_instructions
+STRUCTURE_IMPROVEMENT_TEMPLATE = """
+🏗️ STRUKTUR-VERBESSERUNG (aktuell: {score:.1f}/10):
+- Füge 3-5 konkrete Lernziele pro Hauptkapitel hinzu
+- Erweitere Beispiele: MINIMUM 2 pro Hauptkonzept
+- Ergänze Zusammenfassungen am Ende jeder Sektion
+- Verbessere Nummerierung und Hierarchie-Struktur
+"""
+
+READABILITY_IMPROVEMENT_TEMPLATE = """
+📖 LESBARKEITS-VERBESSERUNG (aktuell: {score:.1f}/10):
+- Teile lange Sätze auf (max. 20 Wörter)
+- Erkläre Fachbegriffe beim ersten Auftreten
+- Vereinfache komplexe Formulierungen
+- Füge mehr Zwischenüberschriften ein
+"""
+
+CONSISTENCY_IMPROVEMENT_TEMPLATE = """
+🎯 KONSISTENZ-VERBESSERUNG (aktuell: {score:.1f}/10):
+- Verwende Fachbegriffe durchgehend einheitlich
+- Standardisiere Format und Tonalität  
+- Korrigiere widersprüchliche Aussagen
+- Vereinheitliche Beispiel-Struktur
+"""
+
+QUALITY_GATE_TEMPLATE = """
+⚠️ QUALITÄTS-GATE: Gesamt-Score {score:.1f}/10 nicht ausreichend!
+ZIEL: Mindestens 7.5/10 für Production-Release erforderlich.
+Führe ALLE oben genannten Verbesserungen systematisch durch.
+"""
+
+# (component_scores-Schlüssel, Template) in Ausgabe-Reihenfolge
+_COMPONENT_IMPROVEMENT_TEMPLATES = (
+    ('structure', STRUCTURE_IMPROVEMENT_TEMPLATE),
+    ('readability', READABILITY_IMPROVEMENT_TEMPLATE),
+    ('consistency', CONSISTENCY_IMPROVEMENT_TEMPLATE),
+)
+
+# FALLBACK ASSISTANTS: Gemeinsames Template (Flyweight) + rollenspezifische Overrides
+_FALLBACK_COMMON = MappingProxyType({
+    'assistant_id': 'asst_19FlW2QtTAIb7Z96f3ukfSre',
+    'model': 'gpt-4o',
+    'top_p': 1.0,
+    'frequency_penalty': 0.0,
+    'presence_penalty': 0.0,
+    'retry_attempts': 3,
+    'timeout_seconds': 300,
+    'enabled_tools': ('create_content', 'optimize_didactics', 'critically_review', 'request_user_feedback', 'knowledge_lookup')
+})
+
+FALLBACK_CONTENT_CREATOR_INSTRUCTIONS = '''Du bist ein Experte für die Erstellung von hochwertigen Lerninhalten.
+                
+DEINE AUFGABE: Erstelle strukturierte, professionelle Kursinhalte basierend auf dem gegebenen Thema.
+Erstelle immer vollständige, sofort einsetzbare Kursinhalte mit klaren Lernzielen, logischem Aufbau und praktischen Beispielen.'''
+
+FALLBACK_DIDACTIC_EXPERT_INSTRUCTIONS = '''Du bist ein Didaktik-Experte für die Optimierung von Lerninhalten.
+                
+DEINE AUFGABE: Optimiere vorhandene Kursinhalte didaktisch und methodisch.
+Gib den vollständig optimierten Kursinhalt aus (nicht nur Verbesserungsvorschläge)!'''
+
+FALLBACK_QUALITY_CHECKER_INSTRUCTIONS = '''Du bist ein Qualitäts-Experte für die finale Prüfung von Kursinhalten.
+                
+DEINE AUFGABE: Führe eine kritische Qualitätsprüfung durch und korrigiere Mängel.
+Gib den vollständig korrigierten und qualitätsgesicherten Kurs aus!'''
+
+# (role, name, description, instructions, temperature, max_tokens) - instructions None = Supervisor-Instructions
+_FALLBACK_ROLES = (
+    ('supervisor', 'Fallback Supervisor', 'Fallback Supervisor für lokale Entwicklung', None, 0.7, 2000),
+    ('content_creator', 'Fallback Content Creator', 'Fallback Content Creator für Kursinhalte', FALLBACK_CONTENT_CREATOR_INSTRUCTIONS, 0.3, 3000),
+    ('didactic_expert', 'Fallback Didactic Expert', 'Fallback Didactic Expert für didaktische Optimierung', FALLBACK_DIDACTIC_EXPERT_INSTRUCTIONS, 0.4, 3000),
+    ('quality_checker', 'Fallback Quality Checker', 'Fallback Quality Checker für finale Prüfung', FALLBACK_QUALITY_CHECKER_INSTRUCTIONS, 0.2, 3000)
+)
+
+_fallback_assistants: Optional[Dict[str, Dict[str, Any]]] = None
+
+def _get_fallback_assistants() -> Dict[str, Dict[str, Any]]:
+    """Baut die Fallback-Assistants beim ersten Bedarf auf und cached sie modulweit"""
+    global _fallback_assistants
+    if _fallback_assistants is None:
+        _fallback_assistants = {
+            role: {
+                **_FALLBACK_COMMON,
+                'id': assistant_pk,
+                'name': name,
+                'role': role,
+                'description': description,
+                'instructions': instructions if instructions is not None else SUPERVISOR_INSTRUCTIONS,
+                'temperature': temperature,
+                'max_tokens': max_tokens
+            }
+            for assistant_pk, (role, name, description, instructions, temperature, max_tokens) in enumerate(_FALLBACK_ROLES, 1)
+        }
+    return _fallback_assistants
+
+# (Sekunde, formatierter String) - Tupel-Austausch ist atomar, daher ohne Lock threadsicher
+_hms_cache = (-1, '')
+
+def _now_hms(_fmt='%H:%M:%S') -> str:
+    """
+    Aktuelle Uhrzeit als HH:MM:SS für Frontend-Timestamps.
+    PERFORMANCE: Innerhalb derselben Sekunde wird der gecachte String geliefert (kein datetime-Objekt, kein strftime)
+    """
+    global _hms_cache
+    second = int(time.time())
+    cached_second, cached_text = _hms_cache
+    if second == cached_second:
+        return cached_text
+    text = time.strftime(_fmt, time.localtime(second))
+    _hms_cache = (second, text)
+    return text
+
+def _compile_keywords(patterns) -> re.Pattern:
+    """Kompiliert Keywords zu einer Substring-Alternation (längste zuerst)"""
+    return re.compile('|'.join(re.escape(p) for p in sorted(patterns, key=len, reverse=True)))
+
+_GREETING_RE = _compile_keywords(GREETING_PATTERNS)
+_SMALL_TALK_RE = _compile_keywords(SMALL_TALK_PATTERNS)
+_COURSE_RE = _compile_keywords(COURSE_PATTERNS)
+
+# Unterkategorien für Small-Talk-Antworten (Substring-Suche wie bei den Intent-Patterns)
+THANKS_PATTERNS = ('danke', 'dankeschön', 'vielen dank')
+ABOUT_ASSISTANT_PATTERNS = ('wie geht', 'was machst du', 'was kannst du')
+_THANKS_RE = _compile_keywords(THANKS_PATTERNS)
+_ABOUT_ASSISTANT_RE = _compile_keywords(ABOUT_ASSISTANT_PATTERNS)
+
+# PERFORMANCE: Mit pyahocorasick (C-Extension) alle Intent-Keywords in einem Durchlauf finden,
+# ohne das Paket bleibt es bei den drei vorkompilierten Regex-Alternationen
+try:
+    import ahocorasick
+    
+    _INTENT_AUTOMATON = ahocorasick.Automaton()
+    for _category, _patterns in (('greeting', GREETING_PATTERNS),
+                                 ('small_talk', SMALL_TALK_PATTERNS),
+                                 ('course_request', COURSE_PATTERNS)):
+        for _pattern in _patterns:
+            _INTENT_AUTOMATON.add_word(_pattern, _category)
+    _INTENT_AUTOMATON.make_automaton()
+    del _category, _patterns, _pattern
+except ImportError:
+    _INTENT_AUTOMATON = None
+
+# Indikatoren für eine abgeschlossene Kurserstellung in der Supervisor-Antwort
+COURSE_COMPLETION_INDICATORS = (
+    "Kurs wurde erfolgreich erstellt",
+    "Der Kurs ist jetzt bereit",
+    "Kurserstellung abgeschlossen",
+    "Ihr Kurs ist fertig",
+    "Der komplette Kurs",
+)
+_COURSE_COMPLETE_RE = _compile_keywords(COURSE_COMPLETION_INDICATORS)
+
+# Vorkompilierte Muster für die Extraktion von Kurs-Metadaten und Kapiteln
+_COURSE_TITLE_PATTERNS = tuple(re.compile(pattern, re.MULTILINE) for pattern in (
+    r'^#\s+(.+?)$',  # Markdown H1
+    r'^\*\*(.+?)\*\*$',  # Bold title
+    r'^(.+?)\s*(?:Kurs|Course)',  # Text before "Kurs" or "Course"
+))
+# Themen-Zuordnung anhand des Kurstitels (Reihenfolge = Priorität)
+_COURSE_TOPIC_KEYWORDS = (
+    (('AI', 'KI', 'Agent'), 'AI & Machine Learning'),
+    (('Python', 'Programm'), 'Programming'),
+    (('Business', 'Marketing'), 'Business'),
+)
+_SECTION_NUMBERED_RE = re.compile(r'^\d+\.')
+_SECTION_LABEL_RE = re.compile(r'^[A-Z][^.]*:$')
+
 def cleanup_inactive_orchestrators():
     """
     MEMORY MANAGEMENT: Bereinigt inaktive Orchestrators zur Memory-Optimierung
-    Wird automatisch vom Scheduler aufgerufen
+    Wird automatisch vom Scheduler aufgerufen (app.py, alle CLEANUP_INTERVAL_MINUTES)
     """
     global active_orchestrators, orchestrator_last_activity
     
     now = datetime.now()
     ttl_threshold = now - timedelta(minutes=ORCHESTRATOR_TTL_MINUTES)
+    
+    # THREAD SAFETY: Registry nur unter Lock verändern, Ressourcen-Cleanup danach ohne Lock
+    with _orchestrators_lock:
+        # Identifiziere inaktive Orchestrators (Snapshot, da die Dicts unten verändert werden)
+        inactive_keys = [key for key, last_activity in orchestrator_last_activity.items() if last_activity < ttl_threshold]
+        
+        inactive = []
+        for key in inactive_keys:
+            orchestrator = active_orchestrators.pop(key, None)
+            orchestrator_last_activity.pop(key, None)
+            if orchestrator is not None:
+                inactive.append((key, orchestrator))
+        
+        # Limit enforcement: Bei zu vielen aktiven Orchestrators älteste entfernen
+        excess = []
+        excess_count = len(active_orchestrators) - MAX_CONCURRENT_ORCHESTRATORS
+        if excess_count > 0:
+            # Nur die excess_count ältesten bestimmen: O(N log k) statt komplettem Sortieren
+            for key, _ in heapq.nsmallest(excess_count, orchestrator_last_activity.items(), key=itemgetter(1)):
+                orchestrator = active_orchestrators.pop(key, None)
+                orchestrator_last_activity.pop(key, None)
+                if orchestrator is not None:
+                    excess.append((key, orchestrator))
+        
+        active_count = len(active_orchestrators)
+    
+    # Bereinige inaktive Orchestrators
     cleanup_count = 0
+    for key, orchestrator in inactive:
+        try:
+            orchestrator._cleanup()
+            cleanup_count += 1
+        except Exception as e:
+            logger.warning(f"Orchestrator cleanup error für {key}: {e}")
     
-    # Identifiziere inaktive Orchestrators
-    inactive_keys = []
-    for key, last_activity in orchestrator_last_activity.items():
-        if last_activity < ttl_threshold:
-            inactive_keys.append(key)
+    logger.info(f"🧹 Memory Cleanup: {cleanup_count} inaktive Orchestrators bereinigt. Aktiv: {active_count}")
     
-    # Bereinige inaktive Orchestrators
-    for key in inactive_keys:
-        if key in active_orchestrators:
+    if excess:
+        for key, orchestrator in excess:
             try:
-                # Orchestrator cleanup
-                orchestrator = active_orchestrators[key]
                 orchestrator._cleanup()
-                del active_orchestrators[key]
-                del orchestrator_last_activity[key]
-                cleanup_count += 1
             except Exception as e:
-                logger.warning(f"Orchestrator cleanup error für {key}: {e}")
-    
-    # Force Garbage Collection bei größeren Cleanups
-    if cleanup_count > 5:
-        gc.collect()
-    
-    logger.info(f"🧹 Memory Cleanup: {cleanup_count} inaktive Orchestrators bereinigt. Aktiv: {len(active_orchestrators)}")
-    
-    # Limit enforcement: Bei zu vielen aktiven Orchestrators älteste entfernen
-    if len(active_orchestrators) > MAX_CONCURRENT_ORCHESTRATORS:
-        sorted_by_activity = sorted(orchestrator_last_activity.items(), key=lambda x: x[1])
-        excess_count = len(active_orchestrators) - MAX_CONCURRENT_ORCHESTRATORS
-        
-        for key, _ in sorted_by_activity[:excess_count]:
-            if key in active_orchestrators:
-                try:
-                    active_orchestrators[key]._cleanup()
-                    del active_orchestrators[key]
-                    del orchestrator_last_activity[key]
-                except Exception as e:
-                    logger.warning(f"Force cleanup error für {key}: {e}")
+                logger.warning(f"Force cleanup error für {key}: {e}")
         
-        gc.collect()
         logger.info(f"🚨 Force cleanup: {excess_count} Orchestrators entfernt. Limit: {MAX_CONCURRENT_ORCHESTRATORS}")
 
 def get_or_create_orchestrator(project_id: str, session_id: str, socketio) -> 'DynamicChatOrchestrator':
     """
     MEMORY MANAGEMENT: Factory-Function für Orchestrators mit Activity-Tracking
+    Das Cleanup läuft ausschließlich periodisch über cleanup_inactive_orchestrators().
     """
-    orchestrator_key = f"{project_id}_{session_id}"
-    
-    # Update activity timestamp
-    orchestrator_last_activity[orchestrator_key] = datetime.now()
+    orchestrator_key = (project_id, session_id)
     
-    # Return existing orchestrator
-    if orchestrator_key in active_orchestrators:
-        return active_orchestrators[orchestrator_key]
+    with _orchestrators_lock:
+        # Update activity timestamp
+        orchestrator_last_activity[orchestrator_key] = datetime.now()
+        
+        # Return existing orchestrator
+        orchestrator = active_orchestrators.get(orchestrator_key)
+        if orchestrator is not None:
+            return orchestrator
     
-    # Create new orchestrator
+    # Create new orchestrator (ohne Lock: lädt aus der DB, sendet Events und startet den Emitter-Thread)
     orchestrator = DynamicChatOrchestrator(
         socketio=socketio,
         project_id=project_id,
         session_id=session_id
     )
     
-    active_orchestrators[orchestrator_key] = orchestrator
-    logger.info(f"🤖 Neuer Orchestrator erstellt: {orchestrator_key}. Aktiv: {len(active_orchestrators)}")
+    # Double-Check: Ein paralleler Request derselben Session kann schneller gewesen sein
+    with _orchestrators_lock:
+        existing = active_orchestrators.setdefault(orchestrator_key, orchestrator)
+        orchestrator_last_activity[orchestrator_key] = datetime.now()
+        active_count = len(active_orchestrators)
     
-    # Trigger cleanup if nearing limit
-    if len(active_orchestrators) > MAX_CONCURRENT_ORCHESTRATORS * 0.8:
-        threading.Thread(target=cleanup_inactive_orchestrators, daemon=True).start()
+    if existing is not orchestrator:
+        orchestrator._cleanup(notify=False)  # Duplikat verwerfen, ohne die Session zu benachrichtigen
+        return existing
     
+    logger.info(f"🤖 Neuer Orchestrator erstellt: {orchestrator_key}. Aktiv: {active_count}")
     return orchestrator
 
+class KikiEventHandler(AssistantEventHandler):
+    """
+    STREAMING: Event-Handler für Supervisor-Runs.
+    Leitet Run-Events an den Orchestrator weiter, statt den Run-Status zu pollen.
+    """
+    
+    def __init__(self, orchestrator):
+        super().__init__()
+        self.orchestrator = orchestrator
+        self.final_text = None
+    
+    def on_event(self, event):
+        run = event.data
+        if event.event == 'thread.run.created':
+            self.orchestrator._on_run_created(run)
+        elif event.event == 'thread.run.requires_action':
+            self.orchestrator.current_run = run
+            self.orchestrator._submit_tool_outputs_stream(run)
+        elif event.event == 'thread.run.completed':
+            self.orchestrator.current_run = run
+            # Antworttext kommt aus dem Stream, messages.list nur falls keine Nachricht gestreamt wurde
+            response = self.final_text
+            if response is None:
+                response = self.orchestrator._fetch_last_message_text()
+            self.orchestrator._handle_run_completed(response)
+        elif event.event in ('thread.run.failed', 'thread.run.cancelled', 'thread.run.expired'):
+            self.orchestrator.current_run = run
+            self.orchestrator._handle_run_failed(run)
+    
+    def on_message_done(self, message):
+        if message.content and getattr(message.content[0], 'text', None):
+            self.final_text = message.content[0].text.value
+    
+    def on_exception(self, exception):
+        # Exception wird vom SDK weitergereicht und vom Aufrufer gemeldet
+        logger.error(f"❌ Stream-Fehler im Supervisor-Run: {exception}")
+
 class DynamicChatOrchestrator:
     """
     NEUE DYNAMISCHE VERSION: Chat-Orchestrator mit DB-basiertem Assistant-Management
@@ -144,16 +810,91 @@ class DynamicChatOrchestrator:
     - MEMORY MANAGEMENT: TTL-basiertes Cleanup-System
     """
     
+    # PERFORMANCE: Klassenweiter Assistant-Cache (ein DB-Query pro TTL-Fenster statt pro Orchestrator)
+    _assistants_cache: Optional[Mapping[str, Dict[str, Any]]] = None
+    _assistants_cache_expires: float = 0
+    
+    # Antwort-Pools für Begrüßung und Small Talk (einmal pro Klasse statt pro Nachricht angelegt)
+    _GREETING_RESPONSES = (
+        "Hallo! Schön, Sie zu sehen. Wie kann ich Ihnen heute helfen?",
+        "Hi! Ich bin Ihr KI-Assistent für die Kurserstellung. Was kann ich für Sie tun?",
+        "Guten Tag! Möchten Sie einen neuen Kurs erstellen oder haben Sie Fragen?",
+        "Hallo! Ich freue mich, Ihnen bei der Kurserstellung helfen zu können."
+    )
+    _THANKS_RESPONSES = (
+        "Gerne! Falls Sie weitere Fragen haben, bin ich da.",
+        "Sehr gerne! Kann ich Ihnen noch bei etwas anderem helfen?",
+        "Freut mich, dass ich helfen konnte!"
+    )
+    _ABOUT_ASSISTANT_RESPONSES = (
+        "Ich bin Ihr KI-Assistent für die automatische Kurserstellung. Ich kann professionelle Lerninhalte zu jedem Thema erstellen.",
+        "Mir geht es gut, danke! Ich helfe dabei, hochwertige Online-Kurse zu entwickeln. Haben Sie ein bestimmtes Thema im Kopf?",
+        "Ich spezialisiere mich auf die Erstellung von strukturierten Lerninhalten mit didaktischer Optimierung."
+    )
+    _SMALL_TALK_RESPONSES = (
+        "Das freut mich! Möchten Sie einen Kurs zu einem bestimmten Thema erstellen?",
+        "Schön! Womit kann ich Ihnen konkret helfen?",
+        "Wenn Sie Fragen haben oder einen Kurs erstellen möchten, sagen Sie einfach Bescheid!"
+    )
+    _DEFAULT_RESPONSES = ("Wie kann ich Ihnen helfen?",)
+    
     def __init__(self, socketio, project_id: Optional[str] = None, session_id: Optional[str] = None):
         self.socketio = socketio
         self.project_id = project_id
         self.session_id = session_id
+        
+        # SocketIO-Events laufen über eine Queue und einen eigenen Emitter-Thread (Reihenfolge bleibt erhalten),
+        # damit Streaming- und Tool-Threads nicht auf Serialisierung und Versand warten
+        self._emit_queue = queue.Queue(maxsize=EMIT_QUEUE_MAX_SIZE)
+        # Nach _cleanup (Sentinel eingereiht) wird direkt gesendet - niemand liest die Queue mehr
+        self._emit_stopped = False
+        self._emit_thread = threading.Thread(
+            target=self._emit_worker, name=f'orch-emit-{session_id}', daemon=True
+        )
+        self._emit_thread.start()
+        
+        # Registry-Key und SocketIO-Räume einmalig pro Orchestrator bilden statt pro Emit
+        self._orchestrator_key = (project_id, session_id)
+        self._session_room = f'session_{session_id}'
+        if session_id:
+            self._room_name = self._session_room
+        elif project_id:
+            self._room_name = f'project_{project_id}'
+        else:
+            self._room_name = None
+        
         self.client = get_openai_client()  # Singleton Client verwenden
         self.supervisor_assistant = None
-        self.assistants: Dict[str, Dict[str, Any]] = {}  # Cache für alle verfügbaren Assistants
+        self._supervisor_loaded = False  # Supervisor abgerufen und Tools/Instructions aktuell
+        # Cache für alle verfügbaren Assistants (read-only, wird bei Reload komplett ersetzt statt mutiert,
+        # damit parallele Tool-Threads ohne Lock lesen können)
+        self.assistants: Mapping[str, Dict[str, Any]] = MappingProxyType({})
         self.thread = None
         self.current_run = None
+        self._run_cancelled = threading.Event()  # Weckt wartendes Polling bei Recovery/Cleanup sofort auf
         self.is_processing = False
+        # SINGLE-FLIGHT: Identische deterministische Sub-Assistant-Anfragen dieser Session teilen sich einen API-Call
+        self._inflight_completions: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        # Laufende Nummer pro Sub-Assistant-Aufruf, damit das Frontend parallele Streams derselben Rolle trennt
+        self._agent_call_ids = itertools.count(1)
+        
+        # Cleanup-Status (schützt vor doppeltem Cleanup und Races mit process_message)
+        self._cleanup_lock = threading.Lock()
+        self._cleaned = False
+        # Verhindert parallele Recoveries (RLock: Recovery kann aus dem eigenen Monitoring erneut auslösen)
+        self._recovery_lock = threading.RLock()
+        # Eigener Zufallsgenerator pro Instanz für Poll-Jitter
+        self._poll_random = random.Random()
+        # Status-Handler für den Polling-Fallback (queued hat keinen eigenen Handler)
+        self._poll_status_handlers = {
+            "completed": self._poll_completed,
+            "requires_action": self._poll_requires_action,
+            "failed": self._poll_failed,
+            "cancelled": self._poll_failed,
+            "expired": self._poll_failed,
+            "in_progress": self._poll_in_progress,
+        }
         
         # Memory tracking
         self.created_at = datetime.now()
@@ -176,13 +917,22 @@ class DynamicChatOrchestrator:
     def _update_activity(self):
         """Aktualisiert Activity-Timestamp für Memory-Management"""
         self.last_activity = datetime.now()
-        orchestrator_key = f"{self.project_id}_{self.session_id}"
-        orchestrator_last_activity[orchestrator_key] = self.last_activity
+        with _orchestrators_lock:
+            orchestrator_last_activity[self._orchestrator_key] = self.last_activity
     
-    def _cleanup(self):
+    def _cleanup(self, notify: bool = True):
         """
-        MEMORY MANAGEMENT: Bereinigt Orchestrator-Ressourcen
+        MEMORY MANAGEMENT: Bereinigt Orchestrator-Ressourcen (idempotent, mehrfacher Aufruf ist ein No-op)
+        notify=False unterdrückt das 'orchestrator_cleanup'-Event (z.B. für verworfene Duplikate)
         """
+        with self._cleanup_lock:
+            if self._cleaned:
+                return
+            self._cleaned = True
+        
+        # Wartendes Polling sofort beenden
+        self._run_cancelled.set()
+        
         try:
             # OpenAI Thread cleanup
             if self.current_run:
@@ -197,26 +947,60 @@ class DynamicChatOrchestrator:
             # Clear references
             self.thread = None
             self.current_run = None
-            self.assistants.clear()
+            self.assistants = MappingProxyType({})
             self.course_content_stages.clear()
             self.response_callbacks.clear()
             
             # SocketIO cleanup
-            if self.socketio and self.session_id:
-                try:
-                    self.socketio.emit('orchestrator_cleanup', {
-                        'message': 'Session bereinigt für Memory-Optimierung'
-                    }, room=f'session_{self.session_id}')
-                except:
-                    pass
+            if notify and self.socketio and self.session_id:
+                self._emit('orchestrator_cleanup', {
+                    'message': 'Session bereinigt für Memory-Optimierung'
+                }, self._session_room)
+            
+            # Emitter-Thread nach den ausstehenden Events beenden, spätere Events direkt senden
+            try:
+                self._emit_queue.put(None, timeout=1)
+            except queue.Full:
+                pass
+            self._emit_stopped = True
             
             logger.info(f"🧹 Orchestrator cleanup abgeschlossen für {self.project_id}_{self.session_id}")
             
         except Exception as e:
             logger.warning(f"Cleanup error: {e}")
     
+    @classmethod
+    def invalidate_assistants_cache(cls):
+        """Verwirft den klassenweiten Assistant-Cache (nach Änderungen an Assistant-Einträgen aufrufen)"""
+        cls._assistants_cache = None
+        cls._assistants_cache_expires = 0
+        
+        # Laufende Orchestrators müssen den Supervisor beim nächsten Request neu abgleichen
+        with _orchestrators_lock:
+            orchestrators = list(active_orchestrators.values())
+        for orchestrator in orchestrators:
+            orchestrator._supervisor_loaded = False
+    
+    def _apply_cached_assistants(self, cached_assistants: Mapping[str, Dict[str, Any]]):
+        """Übernimmt die gecachten Assistants in diese Orchestrator-Instanz (read-only, keine Kopie nötig)"""
+        self.assistants = cached_assistants
+        supervisor = self.assistants.get('supervisor')
+        if supervisor:
+            self.supervisor_assistant_id = supervisor['assistant_id']
+            self.emit_status(f"✅ Supervisor Assistant geladen: {self.supervisor_assistant_id}")
+    
     def _load_assistants_from_db(self):
         """Lädt alle aktiven Assistants aus der SQLAlchemy-Datenbank (PostgreSQL/SQLite)."""
+        cls = type(self)
+        if time.monotonic() < cls._assistants_cache_expires and cls._assistants_cache:
+            self._apply_cached_assistants(cls._assistants_cache)
+            return
+        
+        # Ohne importierbare DB-Modelle direkt auf die Fallback-Assistants gehen
+        if not _HAS_DB:
+            self._create_fallback_supervisor()
+            return
+        
         try:
             # Lazy import to avoid circular dependency
             from models import db, Assistant  # noqa: E402
@@ -224,36 +1008,51 @@ class DynamicChatOrchestrator:
             
             # CRITICAL FIX: Ensure we're in Flask app context
             with current_app.app_context():
-                assistants = Assistant.query.filter_by(is_active=True).order_by(Assistant.order_index.asc()).all()
+                # PERFORMANCE: Nur die benötigten Spalten als Tupel laden (kein ORM-Hydrating)
+                rows = db.session.execute(
+                    db.select(
+                        Assistant.id,
+                        Assistant.name,
+                        Assistant.assistant_id,
+                        Assistant.role,
+                        Assistant.description,
+                        Assistant.instructions,
+                        Assistant.model,
+                        Assistant.temperature,
+                        Assistant.top_p,
+                        Assistant.max_tokens,
+                        Assistant.frequency_penalty,
+                        Assistant.presence_penalty,
+                        Assistant.retry_attempts,
+                        Assistant.timeout_seconds,
+                        Assistant.enabled_tools
+                    )
+                    .where(Assistant.is_active == True)  # noqa: E712
+                    .order_by(Assistant.order_index.asc())
+                ).all()
                 
                 # Cache assistants
-                for assistant in assistants:
-                    assistant_data = {
-                        'id': assistant.id,
-                        'name': assistant.name,
-                        'assistant_id': assistant.assistant_id,
-                        'role': assistant.role,
-                        'description': assistant.description,
-                        'instructions': assistant.instructions,
-                        'model': assistant.model,
-                        'temperature': assistant.temperature,
-                        'top_p': assistant.top_p,
-                        'max_tokens': assistant.max_tokens,
-                        'frequency_penalty': assistant.frequency_penalty,
-                        'presence_penalty': assistant.presence_penalty,
-                        'retry_attempts': assistant.retry_attempts,
-                        'timeout_seconds': assistant.timeout_seconds,
-                        'enabled_tools': json.loads(assistant.enabled_tools) if assistant.enabled_tools else []
-                    }
-                    self.assistants[assistant.role] = assistant_data
+                loaded_assistants = {}
+                for row in rows:
+                    assistant_data = row._asdict()
+                    enabled_tools = assistant_data['enabled_tools']
+                    if isinstance(enabled_tools, str):  # Legacy-Spalte mit JSON-Text
+                        enabled_tools = _json_loads(enabled_tools)
+                    assistant_data['enabled_tools'] = [sys.intern(tool) for tool in enabled_tools] if enabled_tools else []
+                    loaded_assistants[row.role] = assistant_data
                     
                     # Mark supervisor assistant
-                    if assistant.role == 'supervisor':
-                        self.supervisor_assistant_id = assistant.assistant_id
+                    if row.role == 'supervisor':
+                        self.supervisor_assistant_id = row.assistant_id
                         self.emit_status(f"✅ Supervisor Assistant geladen: {self.supervisor_assistant_id}")
                 
+                self.assistants = MappingProxyType(loaded_assistants)
                 if not self.assistants:
                     self.emit_status("⚠️ Keine aktiven Assistants in der Datenbank gefunden")
+                else:
+                    # Klassenweiten Cache befüllen (enabled_tools ist bereits geparst, Mapping ist read-only)
+                    cls._assistants_cache = self.assistants
+                    cls._assistants_cache_expires = time.monotonic() + ASSISTANTS_CACHE_TTL_SECONDS
                     
         except Exception as e:
             logger.error(f"Assistant-Load-Error: {e}")
@@ -265,72 +1064,12 @@ class DynamicChatOrchestrator:
         """Creates fallback assistants when database is not available"""
         logger.info("🔄 Creating fallback assistants (no database access)")
         
-        # Create comprehensive fallback assistant data
-        fallback_assistants = {
-            'supervisor': {
-                'id': 1,
-                'name': 'Fallback Supervisor',
-                'assistant_id': 'asst_19FlW2QtTAIb7Z96f3ukfSre',
-                'role': 'supervisor',
-                'description': 'Fallback Supervisor für lokale Entwicklung',
-                'instructions': self._get_supervisor_instructions(),
-                'model': 'gpt-4o',
-                'temperature': 0.7,
-                'top_p': 1.0,
-                'max_tokens': 2000,
-                'frequency_penalty': 0.0,
-                'presence_penalty': 0.0,
-                'retry_attempts': 3,
-                'timeout_seconds': 300,
-                'enabled_tools': ['create_content','optimize_didactics','critically_review','request_user_feedback','knowledge_lookup']
-            },
-            'content_creator': {
-                'id': 2,
-                'name': 'Fallback Content Creator',
-                'assistant_id': 'asst_19FlW2QtTAIb7Z96f3ukfSre',  # Use same assistant ID
-                'role': 'content_creator',
-                'description': 'Fallback Content Creator für Kursinhalte',
-                'instructions': '''Du bist ein Experte für die Erstellung von hochwertigen Lerninhalten.
-                
-DEINE AUFGABE: Erstelle strukturierte, professionelle Kursinhalte basierend auf dem gegebenen Thema.
-Erstelle immer vollständige, sofort einsetzbare Kursinhalte mit klaren Lernzielen, logischem Aufbau und praktischen Beispielen.''',
-                'model': 'gpt-4o',
-                'temperature': 0.3,
-                'max_tokens': 3000
-            },
-            'didactic_expert': {
-                'id': 3,
-                'name': 'Fallback Didactic Expert',
-                'assistant_id': 'asst_19FlW2QtTAIb7Z96f3ukfSre',
-                'role': 'didactic_expert',
-                'description': 'Fallback Didactic Expert für didaktische Optimierung',
-                'instructions': '''Du bist ein Didaktik-Experte für die Optimierung von Lerninhalten.
-                
-DEINE AUFGABE: Optimiere vorhandene Kursinhalte didaktisch und methodisch.
-Gib den vollständig optimierten Kursinhalt aus (nicht nur Verbesserungsvorschläge)!''',
-                'model': 'gpt-4o',
-                'temperature': 0.4,
-                'max_tokens': 3000
-            },
-            'quality_checker': {
-                'id': 4,
-                'name': 'Fallback Quality Checker',
-                'assistant_id': 'asst_19FlW2QtTAIb7Z96f3ukfSre',
-                'role': 'quality_checker',
-                'description': 'Fallback Quality Checker für finale Prüfung',
-                'instructions': '''Du bist ein Qualitäts-Experte für die finale Prüfung von Kursinhalten.
-                
-DEINE AUFGABE: Führe eine kritische Qualitätsprüfung durch und korrigiere Mängel.
-Gib den vollständig korrigierten und qualitätsgesicherten Kurs aus!''',
-                'model': 'gpt-4o',
-                'temperature': 0.2,
-                'max_tokens': 3000
-            }
-        }
+        # Gemeinsames Template + rollenspezifische Werte, einmalig aufgebaut und modulweit gecached
+        fallback_assistants = _get_fallback_assistants()
         
-        # Load all fallback assistants
-        for role, assistant_data in fallback_assistants.items():
-            self.assistants[role] = assistant_data
+        # Load all fallback assistants (neues Mapping statt In-Place-Änderung)
+        self.assistants = MappingProxyType({**self.assistants, **fallback_assistants})
+        for role in fallback_assistants:
             logger.info(f"✅ Fallback {role} assistant created")
         
         self.supervisor_assistant_id = fallback_assistants['supervisor']['assistant_id']
@@ -356,11 +1095,15 @@ Gib den vollständig korrigierten und qualitätsgesicherten Kurs aus!''',
             
             # Prüfe ob Tools fehlen oder veraltet sind ODER Instructions aktualisiert werden müssen
             needs_update = not self._tools_are_current(current_tools, required_tools)
-            current_instructions = getattr(self.supervisor_assistant, 'instructions', '')
+            current_instructions = getattr(self.supervisor_assistant, 'instructions', '') or ''
             new_instructions = self._get_supervisor_instructions()
             
+            # Hash-Vergleich gegen die beim Import vorberechneten Instructions
+            self._last_remote_instructions_hash = hash(current_instructions)
+            instructions_changed = self._last_remote_instructions_hash != _SUPERVISOR_INSTRUCTIONS_HASH
+            
             # Force update if instructions changed or tools outdated
-            if needs_update or current_instructions != new_instructions:
+            if needs_update or instructions_changed:
                 self.emit_status("🔧 Aktualisiere Supervisor (Tools & Instructions)...")
                 
                 # Update Assistant mit korrekten Tools und Instructions
@@ -414,216 +1157,26 @@ Gib den vollständig korrigierten und qualitätsgesicherten Kurs aus!''',
     
     def _get_required_tools(self):
         """Definiert die erforderlichen Tool-Calls für Multi-Agenten-System"""
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_content",
-                    "description": "Erstellt einen ersten Rohentwurf für ein gegebenes Thema mit Content Creator Agent.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "topic": {
-                                "type": "string",
-                                "description": "Das Thema, zu dem der Inhalt erstellt werden soll."
-                            },
-                            "instructions": {
-                                "type": "string", 
-                                "description": "Spezifische Anweisungen für die Inhaltserstellung."
-                            },
-                            "content_type": {
-                                "type": "string",
-                                "description": "Der Typ des zu erstellenden Inhalts: 'outline' für Inhaltsverzeichnis oder 'full_content' für vollständigen Inhalt.",
-                                "enum": ["outline", "full_content"]
-                            }
-                        },
-                        "required": ["topic", "instructions", "content_type"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "optimize_didactics",
-                    "description": "Optimiert vorhandenen Inhalt didaktisch mit Didactic Expert Agent.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "content": {
-                                "type": "string",
-                                "description": "Der zu optimierende Inhalt."
-                            }
-                        },
-                        "required": ["content"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "critically_review",
-                    "description": "Prüft Inhalt kritisch auf Logik, Fakten und Konsistenz mit Quality Checker Agent.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "content": {
-                                "type": "string",
-                                "description": "Der zu prüfende Inhalt."
-                            },
-                            "review_type": {
-                                "type": "string",
-                                "description": "Der Typ der Prüfung: 'outline' für Inhaltsverzeichnis-Review oder 'full_content' für vollständige Inhaltsprüfung.",
-                                "enum": ["outline", "full_content"]
-                            }
-                        },
-                        "required": ["content", "review_type"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "request_outline_approval",
-                    "description": "Zeigt dem User das geprüfte Inhaltsverzeichnis und fragt nach Freigabe für die Volltext-Erstellung. User kann Änderungen vorschlagen.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "outline": {
-                                "type": "string",
-                                "description": "Das detaillierte Inhaltsverzeichnis mit Kapiteln, Lernzielen und groben Beschreibungen."
-                            },
-                            "quality_feedback": {
-                                "type": "string",
-                                "description": "Das Feedback vom Quality Checker zum Outline."
-                            },
-                            "topic": {
-                                "type": "string",
-                                "description": "Das Kursthema."
-                            }
-                        },
-                        "required": ["outline", "quality_feedback", "topic"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "request_user_feedback", 
-                    "description": "Fordert finales Feedback vom User für den vollständig erstellten Kursinhalt.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "content": {
-                                "type": "string",
-                                "description": "Der finale Kursinhalt für den Feedback benötigt wird."
-                            },
-                            "question": {
-                                "type": "string",
-                                "description": "Die spezifische Frage an den User."
-                            },
-                            "stage": {
-                                "type": "string",
-                                "description": "Das Stadium des Workflows (z.B. 'final_approval')."
-                            }
-                        },
-                        "required": ["content", "question", "stage"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "knowledge_lookup",
-                    "description": "Durchsucht die projektspezifische Wissensbasis nach relevanten Informationen.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Die Suchanfrage für die Wissensbasis."
-                            },
-                            "context": {
-                                "type": "string",
-                                "description": "Zusätzlicher Kontext für die Suche."
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "execute_workflow",
-                    "description": "Führt einen benutzerdefinierten Workflow mit konfigurierten Assistants aus.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "workflow_id": {
-                                "type": "integer",
-                                "description": "Die ID des auszuführenden Workflows."
-                            },
-                            "input_content": {
-                                "type": "string",
-                                "description": "Der Eingabeinhalt für den Workflow (z.B. Kursthema)."
-                            }
-                        },
-                        "required": ["workflow_id", "input_content"]
-                    }
-                }
-            }
-        ]
+        return SUPERVISOR_TOOLS
     
     def _tools_are_current(self, current_tools, required_tools):
         """Prüft ob die aktuellen Tools mit den erforderlichen übereinstimmen"""
         if len(current_tools) != len(required_tools):
             return False
         
-        # Einfache Prüfung: Schaue nach den Function-Namen
-        current_names = set()
-        for tool in current_tools:
-            if tool.type == "function" and hasattr(tool, 'function'):
-                current_names.add(tool.function.name)
-        
-        required_names = set()
-        for tool in required_tools:
-            if tool["type"] == "function":
-                required_names.add(tool["function"]["name"])
-        
+        # Einfache Prüfung: Vergleiche die Function-Namen mit dem vorberechneten Set
+        current_names = frozenset(
+            tool.function.name for tool in current_tools
+            if tool.type == "function" and hasattr(tool, 'function')
+        )
+        required_names = _REQUIRED_TOOL_NAMES if required_tools is SUPERVISOR_TOOLS else frozenset(
+            tool["function"]["name"] for tool in required_tools if tool["type"] == "function"
+        )
         return current_names == required_names
     
     def _get_supervisor_instructions(self):
         """Einfache, klare Instructions für den Supervisor-Assistant"""
-        return """Du bist ein intelligenter KI-Supervisor für automatische Kurserstellung.
-
-DEINE AUFGABE: Erkenne die Nutzerintention und handle entsprechend:
-
-🎯 BEI EXPLIZITEN KURSANFRAGEN:
-Wenn der User eindeutig einen Kurs erstellen möchte (erkennbar an Wörtern wie "Kurs", "erstelle", "Training", "Schulung", "Lerninhalt"):
-
-Führe automatisch diese 3 Schritte aus:
-1. create_content(topic="[Thema]", instructions="Erstelle einen professionellen Kurs")
-2. optimize_didactics(content="[Ergebnis von Schritt 1]")  
-3. critically_review(content="[Ergebnis von Schritt 2]")
-
-WICHTIG für Kurserstellung:
-- Führe ALLE 3 Schritte automatisch aus
-- Verwende die Tool-Outputs direkt weiter
-- Frage NICHT nach Bestätigung zwischen den Schritten
-- Nach Schritt 3 sagst du: "Kurs wurde erfolgreich erstellt!"
-
-💬 BEI ANDEREN ANFRAGEN:
-- Allgemeine Fragen: Beantworte freundlich und kompetent
-- Unklare Themen: Stelle Rückfragen ("Zu welchem Thema soll der Kurs erstellt werden?")
-- Begrüßungen: Antworte höflich und erkläre deine Fähigkeiten
-
-BEISPIELE:
-✅ "Erstelle einen Kurs über Python" → Starte Workflow
-✅ "Ich brauche ein Training zu Vertrieb" → Starte Workflow  
-❌ "Was kannst du?" → Erkläre Fähigkeiten (KEIN Workflow)
-❌ "Wie funktioniert das?" → Beantworte Frage (KEIN Workflow)
-
-Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
+        return SUPERVISOR_INSTRUCTIONS
     
     def create_thread(self):
         """Erstellt einen neuen Chat-Thread."""
@@ -640,81 +1193,244 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
         MAIN METHOD: Verarbeitet User-Nachrichten mit dynamischen DB-Assistants
         MEMORY OPTIMIZED: Activity-Tracking für TTL-Management
         """
-        logger.info(f"🎯 PROCESS_MESSAGE START: user_id={user_id}, message='{message}'")
+        logger.debug("🎯 PROCESS_MESSAGE START: user_id=%s, message='%s'", user_id, message)
         
         self._update_activity()  # Track activity für Memory-Management
         
-        if self.is_processing:
-            logger.warning(f"⏳ Already processing for user {user_id}")
-            self.emit_message("⏳ Ein anderer Prozess läuft bereits. Bitte warten Sie einen Moment.", "assistant")
-            return
+        # THREAD SAFETY: is_processing atomar mit dem Cleanup-Status prüfen und setzen
+        with self._cleanup_lock:
+            cleaned = self._cleaned
+            busy = self.is_processing
+            if not cleaned and not busy:
+                self.is_processing = True
         
-        # INTENT DETECTION: Check if this is a simple greeting or small talk
-        intent = self._detect_intent(message)
-        if intent in ['greeting', 'small_talk']:
-            logger.info(f"🤝 Intent detected as {intent}, sending direct response")
-            self._handle_simple_response(message, intent)
+        if cleaned:
+            logger.warning("🧹 Orchestrator already cleaned up for user %s", user_id)
+            self.emit_message("Die Sitzung wurde zwischenzeitlich bereinigt. Bitte senden Sie Ihre Nachricht erneut.", "assistant")
             return
         
-        # CRITICAL: Supervisor-Assistant sicherstellen
-        logger.info(f"🔍 Loading supervisor assistant for user {user_id}")
-        if not self.get_or_create_assistant():
-            logger.error(f"❌ Failed to load supervisor assistant for user {user_id}")
-            self.emit_error("❌ Supervisor-Assistant konnte nicht geladen werden")
+        if busy:
+            logger.warning("⏳ Already processing for user %s", user_id)
+            self.emit_message("⏳ Ein anderer Prozess läuft bereits. Bitte warten Sie einen Moment.", "assistant")
             return
         
-        logger.info(f"✅ Supervisor assistant loaded for user {user_id}")
-        
-        self.is_processing = True
-        self.emit_status("🤖 KI-Agent arbeitet...")
-        
+        monitor_submitted = False
         try:
-            # Thread erstellen falls nicht vorhanden
-            if not self.thread:
-                logger.info(f"🧵 Creating new thread for user {user_id}")
-                self.thread = self.client.beta.threads.create()
-                self.emit_status("✅ Neuer Thread erstellt")
-                logger.info(f"✅ Thread created: {self.thread.id}")
-            else:
-                logger.info(f"🔄 Using existing thread: {self.thread.id}")
+            # INTENT DETECTION: Check if this is a simple greeting or small talk
+            intent = self._detect_intent(message)
+            if intent in ['greeting', 'small_talk']:
+                logger.debug("🤝 Intent detected as %s, sending direct response", intent)
+                self._handle_simple_response(message, intent)
+                return
+            
+            # CRITICAL: Supervisor-Assistant sicherstellen (nur beim ersten Mal bzw. nach Cache-Invalidierung)
+            if not self._supervisor_loaded:
+                logger.debug("🔍 Loading supervisor assistant for user %s", user_id)
+                if not self.get_or_create_assistant():
+                    logger.error("❌ Failed to load supervisor assistant for user %s", user_id)
+                    self.emit_error("❌ Supervisor-Assistant konnte nicht geladen werden")
+                    return
+                
+                self._supervisor_loaded = True
+                logger.debug("✅ Supervisor assistant loaded for user %s", user_id)
+            
+            self.emit_status("🤖 KI-Agent arbeitet...")
+            
+            # Run im geteilten Pool streamen, process_message kehrt sofort zurück
+            logger.debug("👁️ Starting run stream for user %s", user_id)
+            _monitor_pool.submit(self._process_in_pool, message, user_id, self._current_flask_app())
+            monitor_submitted = True
             
-            # Nachricht zum Thread hinzufügen
-            logger.info(f"📝 Adding message to thread for user {user_id}")
+        except Exception as e:
+            logger.error("❌ Error in process_message for user %s: %s", user_id, e)
+            logger.error("❌ Exception details: %s: %s", type(e).__name__, str(e))
+            self.emit_error(f"❌ Fehler bei der Nachrichtenverarbeitung: {e}")
+        finally:
+            # Nach erfolgreichem Submit gibt _process_in_pool den Orchestrator frei
+            if not monitor_submitted:
+                self.is_processing = False
+                self._update_activity()
+                logger.debug("🏁 PROCESS_MESSAGE END: user_id=%s", user_id)
+    
+    @staticmethod
+    def _current_flask_app():
+        """Liefert die aktuelle Flask-App (für App-Context im Monitor-Pool) oder None"""
+        try:
+            from flask import current_app, has_app_context
+            return current_app._get_current_object() if has_app_context() else None
+        except ImportError:
+            return None
+    
+    def _process_in_pool(self, message, user_id, app=None):
+        """Führt _stream_run im Monitor-Pool aus und gibt den Orchestrator danach wieder frei"""
+        try:
+            with app.app_context() if app is not None else nullcontext():
+                self._stream_run(message)
+            logger.debug("✅ Run stream completed for user %s", user_id)
+        except Exception as e:
+            logger.error("❌ Error in run stream for user %s: %s: %s", user_id, type(e).__name__, str(e))
+            self.emit_error(f"❌ Fehler bei der Nachrichtenverarbeitung: {e}")
+        finally:
+            self.is_processing = False
+            self._update_activity()
+            logger.debug("🏁 PROCESS_MESSAGE END: user_id=%s", user_id)
+    
+    def _stream_run(self, message):
+        """
+        STREAMING: Startet den Supervisor-Run per SSE-Stream statt runs.create + Polling.
+        Tool-Calls, Abschluss und Fehler werden über KikiEventHandler verarbeitet.
+        """
+        _, workflow_params = self.get_api_parameters_for_assistant('supervisor')
+        timeout_seconds = workflow_params.get('timeout_seconds', 180)
+        error_handling = workflow_params.get('error_handling', 'graceful')
+        
+        self._run_cancelled.clear()
+        handler = KikiEventHandler(self)
+        if not self.thread:
+            # Thread, Nachricht und Run in einem Request anlegen
+            stream_manager = self.client.beta.threads.create_and_run_stream(
+                assistant_id=self.supervisor_assistant.id,
+                thread={'messages': [{'role': 'user', 'content': message}]},
+                event_handler=handler
+            )
+        else:
             self.client.beta.threads.messages.create(
                 thread_id=self.thread.id,
                 role="user",
                 content=message
             )
-            logger.info(f"✅ Message added to thread")
-            
-            # Run starten
-            logger.info(f"🚀 Starting run with assistant: {self.supervisor_assistant.id}")
-            self.current_run = self.client.beta.threads.runs.create(
+            stream_manager = self.client.beta.threads.runs.stream(
                 thread_id=self.thread.id,
-                assistant_id=self.supervisor_assistant.id
+                assistant_id=self.supervisor_assistant.id,
+                event_handler=handler
             )
-            logger.info(f"✅ Run created: {self.current_run.id}")
+        
+        # Watchdog: Wall-Clock-Timeout ersetzt die Iterations-/Stuck-Zählung des Polling-Loops
+        self._run_timed_out = False
+        watchdog = threading.Timer(timeout_seconds, self._on_run_timeout)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            with stream_manager as stream:
+                stream.until_done()
+        finally:
+            watchdog.cancel()
+        
+        if self._run_timed_out:
+            self.emit_status(f"⏰ Timeout nach {timeout_seconds}s erreicht")
+            if error_handling == 'graceful':
+                self.emit_error("Entschuldigung, die Verarbeitung dauert zu lange. Bitte versuchen Sie es erneut.")
+            elif error_handling == 'retry':
+                self.emit_status("🔄 Automatischer Restart nach Timeout...")
+                self.force_recovery()
+            else:  # strict
+                self.emit_error("❌ Verarbeitung wegen Timeout abgebrochen.")
+    
+    def _on_run_timeout(self):
+        """Watchdog-Callback: bricht den laufenden Run ab, der Stream endet daraufhin"""
+        self._run_timed_out = True
+        if self.current_run and self.thread:
+            try:
+                self.client.beta.threads.runs.cancel(thread_id=self.thread.id, run_id=self.current_run.id)
+            except Exception as e:
+                logger.warning(f"Run-Cancel nach Timeout fehlgeschlagen: {e}")
+    
+    def _on_run_created(self, run):
+        """Merkt sich Run (und bei neuem Thread die Thread-ID) aus dem Stream"""
+        self.current_run = run
+        if not self.thread:
+            self.thread = SimpleNamespace(id=run.thread_id)
+            self.emit_status("✅ Neuer Thread erstellt")
+    
+    def _submit_tool_outputs_stream(self, run):
+        """Führt die Tool-Calls aus und streamt den fortgesetzten Run weiter"""
+        tool_outputs = self._execute_tool_calls(run)
+        
+        self.emit_status(f"📤 Sende {len(tool_outputs)} Tool-Outputs an OpenAI...")
+        with self.client.beta.threads.runs.submit_tool_outputs_stream(
+            thread_id=run.thread_id,
+            run_id=run.id,
+            tool_outputs=tool_outputs,
+            event_handler=KikiEventHandler(self)
+        ) as stream:
+            self.emit_status("🔄 Tool-Ausführung abgeschlossen, warte auf finale Antwort...")
+            stream.until_done()
+    
+    def _fetch_last_message_text(self):
+        """Holt die letzte Thread-Nachricht per API (nur Polling-Pfad bzw. Fallback bei leerem Stream)"""
+        messages = self.client.beta.threads.messages.list(
+            thread_id=self.thread.id,
+            limit=1
+        )
+        
+        # Prüfen, ob eine Nachricht vorhanden ist
+        if messages.data and messages.data[0].content:
+            return messages.data[0].content[0].text.value
+        return None
+    
+    def _handle_run_completed(self, response):
+        """Verarbeitet die finale Supervisor-Antwort eines abgeschlossenen Runs"""
+        if response:
+            # === HIER IST DIE WICHTIGE ÄNDERUNG ZUR DIAGNOSE ===
+            print(f"DEBUG: Sende folgende Antwort an das Frontend: '{response}'")
             
-            # Monitoring starten
-            logger.info(f"👁️ Starting run monitoring for user {user_id}")
-            self._monitor_run()
-            logger.info(f"✅ Run monitoring completed for user {user_id}")
+            # CRITICAL NEW FEATURE: Save course content if workflow completed successfully
+            if self._is_course_creation_complete(response):
+                logger.info("🎓 Course creation detected as complete, saving to database...")
+                self._save_course_to_database(response)
             
-        except Exception as e:
-            logger.error(f"❌ Error in process_message for user {user_id}: {e}")
-            logger.error(f"❌ Exception details: {type(e).__name__}: {str(e)}")
-            self.emit_error(f"❌ Fehler bei der Nachrichtenverarbeitung: {e}")
-        finally:
-            self.is_processing = False
-            self._update_activity()
-            logger.info(f"🏁 PROCESS_MESSAGE END: user_id={user_id}")
+            self.emit_message(response, "assistant")
+        else:
+            # Dieser Fall wird eintreten, wenn die KI nichts antwortet
+            print("DEBUG: Keine Text-Antwort von OpenAI erhalten. Die Antwort war leer.")
+    
+    def _handle_run_failed(self, run):
+        """Meldet fehlgeschlagene/abgebrochene/abgelaufene Runs mit Detail-Informationen"""
+        # Abbruch durch den Timeout-Watchdog wird in _stream_run gemeldet
+        if run.status == "cancelled" and getattr(self, '_run_timed_out', False):
+            return
+        
+        # ENHANCED ERROR HANDLING: Get detailed error information
+        error_message = f"❌ Verarbeitung fehlgeschlagen: {run.status}"
+        
+        # Try to get detailed error information
+        try:
+            if hasattr(run, 'last_error') and run.last_error:
+                error_details = f"Error Code: {run.last_error.code}, Message: {run.last_error.message}"
+                logger.error(f"🚨 OPENAI RUN ERROR DETAILS: {error_details}")
+                error_message += f"\nDetails: {error_details}"
+            
+            # Also check run steps for more detailed errors
+            run_steps = self.client.beta.threads.runs.steps.list(
+                thread_id=self.thread.id,
+                run_id=run.id
+            )
+            
+            for step in run_steps.data:
+                if step.status == "failed" and hasattr(step, 'last_error') and step.last_error:
+                    step_error = f"Step Error - Code: {step.last_error.code}, Message: {step.last_error.message}"
+                    logger.error(f"🚨 OPENAI STEP ERROR: {step_error}")
+                    if "Details:" not in error_message:
+                        error_message += f"\nStep Details: {step_error}"
+                        
+        except Exception as error_fetch_error:
+            logger.error(f"❌ Could not fetch detailed error info: {error_fetch_error}")
+        
+        self.emit_error(error_message)
+        logger.error(f"🚨 FULL RUN FAILURE: Status={run.status}, RunID={run.id}, ThreadID={self.thread.id}")
     
     def force_recovery(self):
         """Erzwingt Recovery bei hängenden Runs mit sofortigem Neustart"""
         self._update_activity()
         
+        # Parallele Recovery aus einem anderen Thread würde einen zweiten Run starten
+        if not self._recovery_lock.acquire(blocking=False):
+            self.emit_status("ℹ️ Recovery läuft bereits...")
+            return
+        
         try:
             if self.current_run:
+                self._run_cancelled.set()  # Wartendes Polling des alten Runs sofort beenden
                 self.emit_status("🔄 Stoppe hängenden Run...")
                 try:
                     self.client.beta.threads.runs.cancel(thread_id=self.thread.id, run_id=self.current_run.id)
@@ -724,16 +1440,13 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
                 
                 # Status zurücksetzen
                 self.current_run = None
-                time.sleep(1)  # Kurze Pause
                 
                 self.emit_status("🔄 Starte neuen Run für Recovery...")
                 
-                # Neuen Run erstellen
+                # Neuen Run erstellen (ohne feste Pause, wartet nur solange der alte Run noch aktiv ist)
                 try:
-                    self.current_run = self.client.beta.threads.runs.create(
-                        thread_id=self.thread.id,
-                        assistant_id=self.supervisor_assistant.id
-                    )
+                    self.current_run = self._create_recovery_run()
+                    self._run_cancelled.clear()
                     
                     self.emit_status("✅ Recovery-Run erstellt - Monitoring wird fortgesetzt...")
                     # Continue monitoring the new run
@@ -750,9 +1463,29 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
             self.emit_error(f"❌ Recovery-Fehler: {e}")
             self.emit_message("System-Recovery fehlgeschlagen. Bitte nutzen Sie 'reset' für einen manuellen Neustart oder senden Sie Ihre Nachricht erneut.", "assistant")
         finally:
+            self._recovery_lock.release()
             self.is_processing = False
             self._update_activity()
     
+    def _create_recovery_run(self):
+        """
+        Startet den Recovery-Run. Solange der abgebrochene Run serverseitig noch aktiv ist,
+        lehnt die API neue Runs ab - dann kurz mit wachsender Pause erneut versuchen.
+        """
+        delay = RECOVERY_RETRY_MIN_SECONDS
+        for attempt in range(RECOVERY_CREATE_ATTEMPTS):
+            try:
+                return self.client.beta.threads.runs.create(
+                    thread_id=self.thread.id,
+                    assistant_id=self.supervisor_assistant.id
+                )
+            except BadRequestError as e:
+                # Nur die 400-Antwort "Thread ... already has an active run ..." wiederholen
+                if 'already has an active run' not in str(e) or attempt == RECOVERY_CREATE_ATTEMPTS - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+    
     def _process_message_async(self, message, user_data):
         """Asynchrone Nachrichtenverarbeitung"""
         self.is_processing = True
@@ -763,25 +1496,8 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
                 if not self.get_or_create_assistant():
                     return
                     
-            if not self.thread:
-                if not self.create_thread():
-                    return
-            
-            # User-Nachricht zum Thread hinzufügen
-            self.client.beta.threads.messages.create(
-                thread_id=self.thread.id,
-                role="user",
-                content=message
-            )
-            
-            # Run starten
-            self.current_run = self.client.beta.threads.runs.create(
-                thread_id=self.thread.id,
-                assistant_id=self.supervisor_assistant.id
-            )
-            
-            # Run-Status überwachen
-            self._monitor_run()
+            # Run starten und per Stream verarbeiten
+            self._stream_run(message)
             
         except Exception as e:
             self.emit_error(f"❌ Verarbeitungsfehler: {e}")
@@ -798,17 +1514,17 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
         error_handling = workflow_params.get('error_handling', 'graceful')
         
         iteration = 0
-        stuck_count = 0  # Counter für hängende Runs
+        delay = POLL_INTERVAL_MIN_SECONDS  # Exponentieller Backoff, Reset bei Statuswechsel
         last_status = None
-        queued_count = 0  # Special counter for queued status
-        start_time = time.time()
+        start_time = time.monotonic()
+        status_since = start_time  # Zeitpunkt des letzten Statuswechsels
         
         self.emit_status(f"🔄 Monitoring mit Timeout: {timeout_seconds}s, Max-Iterations: {max_iterations}, Error-Handling: {error_handling}")
         
         while iteration < max_iterations:
             try:
                 # Timeout-Check basierend auf DB-Parameter
-                if time.time() - start_time > timeout_seconds:
+                if time.monotonic() - start_time > timeout_seconds:
                     self.emit_status(f"⏰ Timeout nach {timeout_seconds}s erreicht")
                     if error_handling == 'graceful':
                         self.emit_error("Entschuldigung, die Verarbeitung dauert zu lange. Bitte versuchen Sie es erneut.")
@@ -826,101 +1542,43 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
                     run_id=self.current_run.id
                 )
                 
-                # Stuck-Detection: Wenn Status länger als X Iterationen gleich bleibt
+                # Stuck-Detection: Wenn Status länger als X Sekunden gleich bleibt
                 if run.status == last_status:
-                    stuck_count += 1
+                    delay = min(POLL_INTERVAL_MAX_SECONDS, delay * POLL_BACKOFF_FACTOR) + self._poll_random.uniform(0, POLL_JITTER_SECONDS)
                 else:
-                    stuck_count = 0
+                    delay = POLL_INTERVAL_MIN_SECONDS
                     last_status = run.status
+                    status_since = time.monotonic()
+                status_elapsed = time.monotonic() - status_since
                 
                 # Special handling for queued status - much more aggressive
                 if run.status == "queued":
-                    queued_count += 1
-                    self.emit_status(f"⏳ In Warteschlange... ({queued_count}/15)")
+                    self.emit_status(f"⏳ In Warteschlange... ({int(status_elapsed)}/{RUN_QUEUED_TIMEOUT_SECONDS}s)")
                     
-                    # AGGRESSIVE: Cancel after 15 iterations for queued (30 seconds)
-                    if queued_count >= 15:
+                    # AGGRESSIVE: Cancel after 30 seconds in queue
+                    if status_elapsed >= RUN_QUEUED_TIMEOUT_SECONDS:
                         self.emit_status("🚨 Run hängt in Queue - Force Recovery...")
                         self.force_recovery()
                         return
-                else:
-                    queued_count = 0
                 
-                # General stuck detection (reduced to 6 iterations = 12s)
-                if stuck_count >= 6 and run.status in ["queued", "in_progress"]:
+                # General stuck detection (12s ohne Statuswechsel)
+                if status_elapsed >= RUN_STUCK_SECONDS and run.status in ["queued", "in_progress"]:
                     self.emit_status(f"🚨 Run hängt bei Status '{run.status}' - Automatische Recovery...")
                     self.force_recovery()
                     return
                 
-                if run.status == "completed":
-                    # Run erfolgreich abgeschlossen, finale Antwort abrufen
-                    messages = self.client.beta.threads.messages.list(
-                        thread_id=self.thread.id,
-                        limit=1
-                    )
-                    
-                    # Prüfen, ob eine Nachricht vorhanden ist
-                    if messages.data and messages.data[0].content:
-                        response = messages.data[0].content[0].text.value
-                        
-                        # === HIER IST DIE WICHTIGE ÄNDERUNG ZUR DIAGNOSE ===
-                        print(f"DEBUG: Sende folgende Antwort an das Frontend: '{response}'")
-                        
-                        # CRITICAL NEW FEATURE: Save course content if workflow completed successfully
-                        if self._is_course_creation_complete(response):
-                            logger.info("🎓 Course creation detected as complete, saving to database...")
-                            self._save_course_to_database(response)
-                        
-                        self.emit_message(response, "assistant")
-                    else:
-                        # Dieser Fall wird eintreten, wenn die KI nichts antwortet
-                        print("DEBUG: Keine Text-Antwort von OpenAI erhalten. Die Antwort war leer.")
-                        
+                # Status-Dispatch: Handler entscheiden über Abbruch oder sofortiges Weiterpollen
+                handler = self._poll_status_handlers.get(run.status)
+                action = handler(run, iteration) if handler else None
+                if action == _POLL_DONE:
                     break
-                    
-                elif run.status == "requires_action":
-                    # Tool-Calls verarbeiten
-                    self._handle_tool_calls(run)
-                    # CRITICAL FIX: Nach Tool-Handling direkt weitermachen
+                if action == _POLL_NOW:
                     continue
                     
-                elif run.status in ["failed", "cancelled", "expired"]:
-                    # ENHANCED ERROR HANDLING: Get detailed error information
-                    error_message = f"❌ Verarbeitung fehlgeschlagen: {run.status}"
-                    
-                    # Try to get detailed error information
-                    try:
-                        if hasattr(run, 'last_error') and run.last_error:
-                            error_details = f"Error Code: {run.last_error.code}, Message: {run.last_error.message}"
-                            logger.error(f"🚨 OPENAI RUN ERROR DETAILS: {error_details}")
-                            error_message += f"\nDetails: {error_details}"
-                        
-                        # Also check run steps for more detailed errors
-                        run_steps = self.client.beta.threads.runs.steps.list(
-                            thread_id=self.thread.id,
-                            run_id=self.current_run.id
-                        )
-                        
-                        for step in run_steps.data:
-                            if step.status == "failed" and hasattr(step, 'last_error') and step.last_error:
-                                step_error = f"Step Error - Code: {step.last_error.code}, Message: {step.last_error.message}"
-                                logger.error(f"🚨 OPENAI STEP ERROR: {step_error}")
-                                if "Details:" not in error_message:
-                                    error_message += f"\nStep Details: {step_error}"
-                                    
-                    except Exception as error_fetch_error:
-                        logger.error(f"❌ Could not fetch detailed error info: {error_fetch_error}")
-                    
-                    self.emit_error(error_message)
-                    logger.error(f"🚨 FULL RUN FAILURE: Status={run.status}, RunID={run.id}, ThreadID={self.thread.id}")
-                    break
-                    
-                elif run.status in ["queued", "in_progress"]:
-                    # Status-Updates für laufende Verarbeitung (but not for queued - handled above)
-                    if run.status != "queued":
-                        self.emit_status(f"⏳ Verarbeitung läuft... (Status: {run.status}, Iteration: {iteration})")
-                    
-                time.sleep(2)  # Längere Wartezeit für Tool-intensive Workflows
+                # Backoff mit Jitter: nach Statuswechsel schnell pollen, bei gleichbleibendem Status bis 4s.
+                # Recovery/Cleanup beenden das Warten sofort statt nach Ablauf des Intervalls.
+                if self._run_cancelled.wait(delay):
+                    return
                 iteration += 1
                 
             except Exception as e:
@@ -937,156 +1595,305 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
         if iteration >= max_iterations:
             self.emit_error(f"⏰ Timeout: Verarbeitung nach {max_iterations} Iterationen abgebrochen. Bitte versuchen Sie es erneut.")
     
+    def _poll_completed(self, run, iteration):
+        """Polling: Run erfolgreich abgeschlossen, finale Antwort abrufen"""
+        self._handle_run_completed(self._fetch_last_message_text())
+        return _POLL_DONE
+    
+    def _poll_requires_action(self, run, iteration):
+        """Polling: Tool-Calls verarbeiten und direkt weitermachen (CRITICAL FIX: ohne Wartezeit)"""
+        self._handle_tool_calls(run)
+        return _POLL_NOW
+    
+    def _poll_failed(self, run, iteration):
+        """Polling: fehlgeschlagene/abgebrochene/abgelaufene Runs melden"""
+        self._handle_run_failed(run)
+        return _POLL_DONE
+    
+    def _poll_in_progress(self, run, iteration):
+        """Polling: Status-Update für laufende Verarbeitung (queued wird im Loop selbst gemeldet)"""
+        self.emit_status(f"⏳ Verarbeitung läuft... (Status: {run.status}, Iteration: {iteration})")
+        return None
+    
     def _handle_tool_calls(self, run):
         """NEUE DYNAMISCHE VERSION: Verarbeitet Tool-Calls mit DB-Assistant-Routing"""
-        tool_outputs = []
+        tool_outputs = self._execute_tool_calls(run)
         
-        for tool_call in run.required_action.submit_tool_outputs.tool_calls:
-            function_name = tool_call.function.name
-            arguments = json.loads(tool_call.function.arguments)
+        # Tool-Outputs an OpenAI senden
+        try:
+            self.emit_status(f"📤 Sende {len(tool_outputs)} Tool-Outputs an OpenAI...")
             
-            self.emit_status(f"🔧 Führe {function_name} aus...")
+            self.client.beta.threads.runs.submit_tool_outputs(
+                thread_id=self.thread.id,
+                run_id=run.id,
+                tool_outputs=tool_outputs
+            )
+            
+            # Nach Tool-Outputs weiter überwachen
+            self.emit_status("🔄 Tool-Ausführung abgeschlossen, warte auf finale Antwort...")
             
-            # Emit tool call details to frontend
+        except Exception as e:
+            self.emit_error(f"❌ Tool-Output Submission Fehler: {e}")
+            # Bei Tool-Output-Fehlern: Versuche Recovery
+            self.emit_status("🔄 Versuche Recovery nach Tool-Output-Fehler...")
+            time.sleep(2)
+    
+    def _execute_tool_calls(self, run):
+        """
+        Führt alle angeforderten Tool-Calls eines Runs aus und liefert die Tool-Outputs.
+        PERFORMANCE: Mehrere Tool-Calls sind voneinander unabhängig und laufen parallel.
+        """
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        if len(tool_calls) == 1:
+            return [self._dispatch_single_tool(tool_calls[0])]
+        
+        app = self._current_flask_app()
+        with ThreadPoolExecutor(max_workers=min(TOOL_CALL_MAX_WORKERS, len(tool_calls)),
+                                thread_name_prefix='orch-tool') as executor:
+            futures = [executor.submit(self._dispatch_single_tool_in_context, tool_call, app)
+                       for tool_call in tool_calls]
+            # Reihenfolge der Outputs entspricht der Reihenfolge der Tool-Calls
+            return [future.result() for future in futures]
+    
+    def _dispatch_single_tool_in_context(self, tool_call, app=None):
+        """Führt einen Tool-Call im Worker-Thread mit dem Flask-App-Context des Aufrufers aus"""
+        with app.app_context() if app is not None else nullcontext():
+            return self._dispatch_single_tool(tool_call)
+    
+    def _dispatch_single_tool(self, tool_call):
+        """Führt einen einzelnen Tool-Call aus und liefert dessen Tool-Output"""
+        function_name = tool_call.function.name
+        
+        # Unbekannte Tools brauchen ihre Argumente nicht, daher erst danach parsen
+        if function_name not in _REQUIRED_TOOL_NAMES:
+            result = f"❌ Unbekannte Tool-Funktion: {function_name}"
             self.emit_workflow_update({
-                'type': 'tool_call_start',
+                'type': 'tool_call_error',
                 'function': function_name,
-                'arguments': arguments,
-                'timestamp': datetime.now().strftime('%H:%M:%S')
+                'error': result,
+                'timestamp': _now_hms()
             })
-            
-            try:
-                # NEUE DYNAMISCHE TOOL-ROUTING
-                if function_name == "create_content":
-                    content_type = arguments.get("content_type", "full_content")
-                    phase_info = "Outline-Erstellung" if content_type == "outline" else "Volltext-Erstellung"
-                    self.emit_status(f"🖊️ {phase_info} läuft...")
-                    result = self._call_assistant_by_role("content_creator", arguments)
-                    
-                elif function_name == "optimize_didactics":
-                    self.emit_status(f"🎓 Didaktische Optimierung läuft...")
-                    result = self._call_assistant_by_role("didactic_expert", arguments)
-                    
-                elif function_name == "critically_review":
-                    review_type = arguments.get("review_type", "full_content")
-                    review_info = "Outline-Qualitätsprüfung" if review_type == "outline" else "Finale Qualitätsprüfung"
-                    self.emit_status(f"🔍 {review_info} läuft...")
-                    result = self._call_assistant_by_role("quality_checker", arguments)
-                    
-                    try:
-                        # Quality Assessment für Scoring
-                        quality_result = assess_course_quality(result)
-                        
-                        # FIXED: Convert 0-100 scale to 0-10 scale
-                        overall_score_100 = quality_result.get('overall_score', 0)
-                        overall_score_10 = round(overall_score_100 / 10, 1)
-                        
-                        result = result + f"\n\n📊 Quality Score: {overall_score_10}/10"
-                        
-                        # Quality Gate Check with correct 0-10 scale
-                        if overall_score_10 < 7.0:
-                            self.emit_status(f"⚠️ Quality Gate: Score {overall_score_10}/10 - Verbesserung empfohlen")
-                        else:
-                            self.emit_status(f"✅ Quality Gate: Score {overall_score_10}/10 - Qualitätsziel erreicht")
-                            
-                    except Exception as e:
-                        self.emit_status(f"⚠️ Quality Gate Check Fehler: {e}")
-                      
-                elif function_name == "request_outline_approval":
-                    result = self.request_outline_approval(arguments.get("outline", ""), arguments.get("quality_feedback", ""), arguments.get("topic", ""))
-                elif function_name == "request_user_feedback":
-                    result = self.request_user_feedback(arguments.get("content", ""), arguments.get("question", ""), arguments.get("stage", ""))
-                elif function_name == "knowledge_lookup":
-                    self.emit_status(f"📚 Wissensbasis-Suche läuft...")
-                    result = self.knowledge_lookup(arguments.get("query", ""), arguments.get("context", ""))
-                elif function_name == "execute_workflow":
-                    self.emit_status(f"🔄 Führe benutzerdefinierten Workflow aus...")
-                    workflow_id = arguments.get("workflow_id")
-                    input_content = arguments.get("input_content", "")
-                    result = self.execute_workflow_steps(workflow_id, input_content)
-                else:
-                    result = f"❌ Unbekannte Tool-Funktion: {function_name}"
-                
-                # Emit tool call result to frontend
-                self.emit_workflow_update({
-                    'type': 'tool_call_result',
-                    'function': function_name,
-                    'result': result if function_name in ['request_outline_approval', 'request_user_feedback', 'knowledge_lookup'] else 'Content generated successfully',
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
-                })
-                
-                # Limitiere Output-Größe für Stabilität
-                if len(str(result)) > 3000:
-                    result = str(result)[:3000] + "... [Inhalt gekürzt für Tool-Output]"
-                
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "output": str(result)
-                })
-                
-                self.emit_status(f"✅ {function_name} abgeschlossen")
-                
-            except Exception as tool_error:
-                error_msg = f"Tool-Fehler in {function_name}: {str(tool_error)}"
-                self.emit_error(error_msg)
-                
-                # Emit error to workflow
-                self.emit_workflow_update({
-                    'type': 'tool_call_error',
-                    'function': function_name,
-                    'error': error_msg,
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
-                })
-                
-                tool_outputs.append({
-                    "tool_call_id": tool_call.id,
-                    "output": error_msg
-                })
+            return {
+                "tool_call_id": tool_call.id,
+                "output": result
+            }
+        
+        arguments = _json_loads(tool_call.function.arguments)
+        
+        self.emit_status(f"🔧 Führe {function_name} aus...")
+        
+        # Emit tool call details to frontend
+        self.emit_workflow_update({
+            'type': 'tool_call_start',
+            'function': function_name,
+            'arguments': arguments,
+            'timestamp': _now_hms()
+        })
         
-        # Tool-Outputs an OpenAI senden
         try:
-            self.emit_status(f"📤 Sende {len(tool_outputs)} Tool-Outputs an OpenAI...")
+            # NEUE DYNAMISCHE TOOL-ROUTING
+            if function_name == "create_content":
+                content_type = arguments.get("content_type", "full_content")
+                phase_info = "Outline-Erstellung" if content_type == "outline" else "Volltext-Erstellung"
+                self.emit_status(f"🖊️ {phase_info} läuft...")
+                result = self._call_assistant_by_role("content_creator", arguments)
+                
+            elif function_name == "optimize_didactics":
+                self.emit_status(f"🎓 Didaktische Optimierung läuft...")
+                result = self._call_assistant_by_role("didactic_expert", arguments)
+                
+            elif function_name == "critically_review":
+                review_type = arguments.get("review_type", "full_content")
+                review_info = "Outline-Qualitätsprüfung" if review_type == "outline" else "Finale Qualitätsprüfung"
+                self.emit_status(f"🔍 {review_info} läuft...")
+                result = self._call_assistant_by_role("quality_checker", arguments)
+                
+                try:
+                    # Quality Assessment für Scoring
+                    quality_result = assess_course_quality(result)
+                    
+                    # FIXED: Convert 0-100 scale to 0-10 scale
+                    overall_score_100 = quality_result.get('overall_score', 0)
+                    overall_score_10 = round(overall_score_100 / 10, 1)
+                    
+                    result = result + f"\n\n📊 Quality Score: {overall_score_10}/10"
+                    
+                    # Quality Gate Check with correct 0-10 scale
+                    if overall_score_10 < 7.0:
+                        self.emit_status(f"⚠️ Quality Gate: Score {overall_score_10}/10 - Verbesserung empfohlen")
+                    else:
+                        self.emit_status(f"✅ Quality Gate: Score {overall_score_10}/10 - Qualitätsziel erreicht")
+                        
+                except Exception as e:
+                    self.emit_status(f"⚠️ Quality Gate Check Fehler: {e}")
+                  
+            elif function_name == "request_outline_approval":
+                result = self.request_outline_approval(arguments.get("outline", ""), arguments.get("quality_feedback", ""), arguments.get("topic", ""))
+            elif function_name == "request_user_feedback":
+                result = self.request_user_feedback(arguments.get("content", ""), arguments.get("question", ""), arguments.get("stage", ""))
+            elif function_name == "knowledge_lookup":
+                self.emit_status(f"📚 Wissensbasis-Suche läuft...")
+                result = self.knowledge_lookup(arguments.get("query", ""), arguments.get("context", ""))
+            elif function_name == "execute_workflow":
+                self.emit_status(f"🔄 Führe benutzerdefinierten Workflow aus...")
+                workflow_id = arguments.get("workflow_id")
+                input_content = arguments.get("input_content", "")
+                result = self.execute_workflow_steps(workflow_id, input_content)
+            else:
+                result = f"❌ Unbekannte Tool-Funktion: {function_name}"
             
-            self.client.beta.threads.runs.submit_tool_outputs(
-                thread_id=self.thread.id,
-                run_id=run.id,
-                tool_outputs=tool_outputs
-            )
+            # Emit tool call result to frontend
+            self.emit_workflow_update({
+                'type': 'tool_call_result',
+                'function': function_name,
+                'result': result if function_name in ['request_outline_approval', 'request_user_feedback', 'knowledge_lookup'] else 'Content generated successfully',
+                'timestamp': _now_hms()
+            })
             
-            # Nach Tool-Outputs weiter überwachen
-            self.emit_status("🔄 Tool-Ausführung abgeschlossen, warte auf finale Antwort...")
+            # Limitiere Output-Größe für Stabilität (nur einmal in str umwandeln)
+            output = result if isinstance(result, str) else str(result)
+            if len(output) > TOOL_OUTPUT_MAX_CHARS:
+                output = output[:TOOL_OUTPUT_MAX_CHARS] + "... [Inhalt gekürzt für Tool-Output]"
+            
+            self.emit_status(f"✅ {function_name} abgeschlossen")
+            
+            return {
+                "tool_call_id": tool_call.id,
+                "output": output
+            }
+            
+        except Exception as tool_error:
+            error_msg = f"Tool-Fehler in {function_name}: {str(tool_error)}"
+            self.emit_error(error_msg)
             
+            # Emit error to workflow
+            self.emit_workflow_update({
+                'type': 'tool_call_error',
+                'function': function_name,
+                'error': error_msg,
+                'timestamp': _now_hms()
+            })
+            
+            return {
+                "tool_call_id": tool_call.id,
+                "output": error_msg
+            }
+
+    
+    def _single_flight_completion(self, assistant_data, prompt, call_id):
+        """
+        Führt den Chat-Completion-Call eines Sub-Assistants aus. Läuft in dieser Session bereits ein identischer
+        Call (gleiches Model, Instructions, Parameter und Prompt) mit temperature 0, wird auf dessen Ergebnis gewartet.
+        """
+        temperature = assistant_data.get('temperature', 0.3)
+        max_tokens = assistant_data.get('max_tokens', 3000)
+        if temperature:
+            # Mit temperature > 0 sind unterschiedliche Antworten gewollt - kein geteiltes Ergebnis
+            return self._stream_completion(assistant_data, prompt, temperature, max_tokens, call_id)
+        
+        key_source = "\x00".join((assistant_data['model'], assistant_data['instructions'] or "",
+                                   str(temperature), str(max_tokens), prompt))
+        key = hashlib.blake2b(key_source.encode('utf-8'), digest_size=16).hexdigest()
+        
+        with self._inflight_lock:
+            future = self._inflight_completions.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._inflight_completions[key] = Future()
+        
+        if not is_leader:
+            self.emit_status(f"⏳ Identische Anfrage an {assistant_data['name']} läuft bereits, warte auf Ergebnis...")
+            try:
+                result = future.result(timeout=OPENAI_HTTP_READ_TIMEOUT_SECONDS)
+            except FutureTimeoutError:
+                logger.warning(f"⚠️ Identische Anfrage an {assistant_data['name']} hängt, starte eigenen Call")
+                return self._stream_completion(assistant_data, prompt, temperature, max_tokens, call_id)
+            # Gesammelte Antwort als Token-Stream nachliefern, damit die Live-Ansicht dieses Calls gefüllt wird
+            self.emit_workflow_update({'type': 'agent_token', 'agent': assistant_data['name'], 'call_id': call_id,
+                                       'delta': result})
+            return result
+        
+        try:
+            result = self._stream_completion(assistant_data, prompt, temperature, max_tokens, call_id)
+            future.set_result(result)
+            return result
         except Exception as e:
-            self.emit_error(f"❌ Tool-Output Submission Fehler: {e}")
-            # Bei Tool-Output-Fehlern: Versuche Recovery
-            self.emit_status("🔄 Versuche Recovery nach Tool-Output-Fehler...")
-            time.sleep(2)
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight_completions.pop(key, None)
+    
+    def _stream_completion(self, assistant_data, prompt, temperature, max_tokens, call_id):
+        """Assistant über OpenAI API aufrufen (STREAMING: Tokens laufend an das Frontend)"""
+        response = self.client.chat.completions.create(
+            model=assistant_data['model'],
+            messages=[
+                {"role": "system", "content": assistant_data['instructions']},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        return self._collect_streamed_completion(response, assistant_data['name'], call_id)
+    
+    def _collect_streamed_completion(self, response, agent_name, call_id):
+        """Sammelt einen Chat-Completion-Stream und sendet Token-Deltas gedrosselt als 'agent_token'"""
+        chunks = []
+        pending = []
+        last_flush = time.monotonic()
+        
+        for chunk in response:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            chunks.append(delta)
+            pending.append(delta)
+            
+            # Drosselung: höchstens alle AGENT_TOKEN_FLUSH_CHUNKS Deltas bzw. AGENT_TOKEN_FLUSH_SECONDS senden
+            now = time.monotonic()
+            if len(pending) >= AGENT_TOKEN_FLUSH_CHUNKS or now - last_flush >= AGENT_TOKEN_FLUSH_SECONDS:
+                self.emit_workflow_update({'type': 'agent_token', 'agent': agent_name, 'call_id': call_id,
+                                           'delta': ''.join(pending)})
+                pending.clear()
+                last_flush = now
+        
+        if pending:
+            self.emit_workflow_update({'type': 'agent_token', 'agent': agent_name, 'call_id': call_id,
+                                       'delta': ''.join(pending)})
+        
+        return ''.join(chunks)
     
     def _call_assistant_by_role(self, role, arguments):
         """NEUE FUNKTION: Ruft Assistant basierend auf Rolle aus Datenbank auf"""
         
         # CRITICAL FIX: Fallback to supervisor if specific role is not available
-        if role not in self.assistants:
+        assistants = self.assistants  # Snapshot, falls parallel neu geladen wird
+        assistant_data = assistants.get(role)
+        if assistant_data is None:
             logger.warning(f"⚠️ Assistant role '{role}' not found in database, falling back to supervisor")
-            if 'supervisor' in self.assistants:
-                assistant_data = self.assistants['supervisor']
-                logger.info(f"✅ Using supervisor assistant as fallback for {role}")
-            else:
+            assistant_data = assistants.get('supervisor')
+            if assistant_data is None:
                 logger.error(f"❌ No supervisor assistant available as fallback for {role}")
                 return f"Assistant mit Rolle '{role}' nicht in Datenbank konfiguriert und kein Supervisor-Fallback verfügbar."
-        else:
-            assistant_data = self.assistants[role]
+            logger.info(f"✅ Using supervisor assistant as fallback for {role}")
         
         try:
             self.emit_status(f"🤖 {assistant_data['name']} arbeitet (Rolle: {role})...")
+            started_at = _now_hms()  # gilt für agent_start und agent_prompt
+            call_id = next(self._agent_call_ids)
             
             # Emit agent communication details
             self.emit_workflow_update({
                 'type': 'agent_start',
                 'agent': assistant_data['name'],
+                'call_id': call_id,
                 'role': role,
                 'model': assistant_data['model'],
-                'timestamp': datetime.now().strftime('%H:%M:%S')
+                'timestamp': started_at
             })
             
             # Je nach Tool-Call die entsprechende Prompt erstellen
@@ -1104,33 +1911,24 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
             self.emit_workflow_update({
                 'type': 'agent_prompt',
                 'agent': assistant_data['name'],
+                'call_id': call_id,
                 'prompt': prompt[:200] + "..." if len(prompt) > 200 else prompt,
-                'timestamp': datetime.now().strftime('%H:%M:%S')
+                'timestamp': started_at
             })
             
             # ENHANCED ERROR HANDLING: More detailed OpenAI API call
             logger.info(f"🚀 Making OpenAI API call for {role} with model {assistant_data['model']}")
             
-            # Assistant über OpenAI API aufrufen
-            response = self.client.chat.completions.create(
-                model=assistant_data['model'],
-                messages=[
-                    {"role": "system", "content": assistant_data['instructions']},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=assistant_data.get('temperature', 0.3),
-                max_tokens=assistant_data.get('max_tokens', 3000)
-            )
-            
-            result = response.choices[0].message.content
+            result = self._single_flight_completion(assistant_data, prompt, call_id)
             logger.info(f"✅ OpenAI API call successful for {role}, response length: {len(result)}")
             
             # Emit agent response summary
             self.emit_workflow_update({
                 'type': 'agent_response',
                 'agent': assistant_data['name'],
+                'call_id': call_id,
                 'response': result[:300] + "..." if len(result) > 300 else result,
-                'timestamp': datetime.now().strftime('%H:%M:%S')
+                'timestamp': _now_hms()
             })
             
             self.emit_status(f"✅ {assistant_data['name']} abgeschlossen")
@@ -1146,96 +1944,13 @@ Analysiere die Nutzeranfrage sorgfältig und handle situationsgerecht!"""
         topic = arguments.get("topic", "")
         instructions = arguments.get("instructions", "")
         
-        return f"""🎯 AUFTRAG: Erstelle einen STRUKTUR-OPTIMIERTEN, hochwertigen Kursentwurf für "{topic}".
-
-📋 QUALITY-REQUIREMENTS (Ziel: >7.5/10 Score):
-
-🏗️ OBLIGATORISCHE STRUKTUR-ELEMENTE:
-✅ Nummerierte Hauptkapitel (1., 2., 3., 4., 5.)
-✅ Klare Unterkapitel mit Nummerierung (1.1, 1.2, etc.)
-✅ Maximal 3 Hierarchie-Ebenen
-✅ Logische Progression: Grundlagen → Anwendung → Vertiefung
-
-📚 LERNZIELE (OBLIGATORISCH für Score >5.0):
-✅ 3-5 konkrete Lernziele pro Hauptkapitel
-✅ Format: "Nach diesem Kapitel können Sie..."
-✅ Messbare, spezifische Outcomes
-✅ SMART-Kriterien befolgen
-
-🎓 DIDAKTISCHE STRUKTUR:
-✅ Einführung mit Motivation und Überblick
-✅ Jeder Abschnitt: Ziel → Inhalt → Beispiel → Checkpoint
-✅ Mindestens 1 praktisches Beispiel pro Hauptkonzept  
-✅ Kurze Zusammenfassung am Ende jedes Kapitels
-✅ Wissencheck-Fragen nach jedem Hauptkapitel
-
-📝 CONTENT-STANDARDS:
-✅ Deutsche Sprache, professionelle Tonalität
-✅ Konsistente Terminologie (Glossar-ready)
-✅ Verständlich für Einsteiger bis Fortgeschrittene
-✅ Actionable Content mit klaren Handlungsempfehlungen
-
-🔍 QUALITÄTS-CHECKPOINTS:
-✅ Jeder Abschnitt <500 Wörter für bessere Lesbarkeit
-✅ Bullet Points für komplexe Listen
-✅ Hervorhebungen für Schlüsselbegriffe
-✅ Call-to-Action am Ende jedes Abschnitts
-
-ADDITIONAL INSTRUCTIONS:
-{instructions}
-
-⚡ WICHTIG: Nutze knowledge_lookup ZUERST bei hochgeladenen Dateien für domain-spezifisches Wissen!
-
-🎯 ERFOLGSKRITERIUM: Struktur-Score >8.0, Didaktik-Score >7.0, Gesamt-Score >7.5"""
+        return CONTENT_PROMPT_TEMPLATE.format(topic=topic, instructions=instructions)
     
     def _create_didactic_prompt(self, arguments):
         """Erstellt VERSTÄRKTEN Prompt für Didactic Expert mit Quality-Enforcement"""
         content = arguments.get("content", "")
         
-        return f"""🎓 DIDAKTISCHE OPTIMIERUNG: Transformiere den Kurs von 4.0 auf >7.0 Didaktik-Score!
-
-EINGANGSMATERIAL:
-{content}
-
-🚀 OPTIMIERUNGS-ZIELE (Score-Verbesserung):
-
-📚 LERNZIEL-OPTIMIERUNG (Struktur-Boost):
-✅ Prüfe: Sind 3-5 Lernziele pro Kapitel vorhanden?
-✅ Erweitere fehlende Lernziele im Format: "Nach diesem Kapitel können Sie..."
-✅ Konkretisiere vage Ziele zu messbaren Outcomes
-✅ Verknüpfe Lernziele mit praktischen Anwendungen
-
-🔍 BEISPIEL-INTEGRATION (Didaktik-Boost):
-✅ MINIMUM: 2 konkrete Beispiele pro Hauptkonzept
-✅ Mix aus: Real-World Cases, Code-Snippets, Step-by-Step Demos
-✅ Progressiver Schwierigkeitsgrad: Einfach → Komplex
-✅ Direkte Verbindung zu Lernzielen herstellen
-
-📝 ZUSAMMENFASSUNGS-STRUKTUR:
-✅ Kapitel-Zusammenfassung: 3-5 Kernpunkte als Bullet Points
-✅ Lessons Learned: "Das Wichtigste in Kürze"  
-✅ Next Steps: Klare Handlungsempfehlungen
-✅ Checkpoint-Fragen: 2-3 Selbsttest-Fragen
-
-🎯 INTERAKTIVE ELEMENTE:
-✅ Reflexions-Prompts: "Überlegen Sie..." 
-✅ Praxis-Aufgaben: "Probieren Sie aus..."
-✅ Checklisten für komplexe Prozesse
-✅ "Häufige Fehler"-Boxen mit Lösungen
-
-📊 VERSTÄNDLICHKEITS-OPTIMIERUNG:
-✅ Komplexe Begriffe sofort erklären (Glossar-ready)
-✅ Lange Sätze aufteilen (max. 20 Wörter/Satz)
-✅ Fachbegriffe konsistent verwenden
-✅ Logische Übergänge zwischen Abschnitten
-
-🎨 STRUKTUR-VERBESSERUNG:
-✅ Einheitliche Kapitel-Templates verwenden
-✅ Visueller Flow: Intro → Content → Example → Summary → Action
-✅ Konsistente Formatierung und Hervorhebungen
-✅ Klare Hierarchie beibehalten
-
-🎯 ERFOLGSKRITERIUM: Didaktik-Score von 4.0 auf >7.0 steigern durch systematische Verbesserung aller Dimensionen!"""
+        return DIDACTIC_PROMPT_TEMPLATE.format(content=content)
     
     def _create_quality_prompt(self, arguments):
         """Erstellt GEHÄRTETEN Prompt für Quality Checker mit automatischen Quality Gates"""
@@ -1244,50 +1959,11 @@ EINGANGSMATERIAL:
         
         if feedback:
             # Regeneration mode with specific feedback
-            return f"""🔍 QUALITÄTS-VERBESSERUNG: Korrigiere den Kurs basierend auf spezifischem Feedback!
-
-URSPRÜNGLICHER KURS:
-{content}
-
-VERBESSERUNGS-ANWEISUNGEN:
-{feedback}
-
-⚡ DEINE AUFGABE:
-Korrigiere den Kurs systematisch basierend auf dem Feedback und gib den VOLLSTÄNDIGEN, VERBESSERTEN KURS aus.
-
-🎯 WICHTIG: 
-- Gib NUR den korrigierten Kursinhalt aus
-- KEIN JSON, keine Bewertung, keine Analyse
-- Vollständiger Kurs mit allen Verbesserungen
-- Alle Probleme behoben gemäß Feedback
-
-AUSGABE: Der komplette, verbesserte Kurs in Markdown-Format."""
+            return QUALITY_IMPROVEMENT_PROMPT_TEMPLATE.format(content=content, feedback=feedback)
 
         else:
             # Standard quality check mode
-            return f"""🔍 KRITISCHE QUALITÄTSPRÜFUNG: Prüfe und verbessere den Kurs!
-
-ZU PRÜFENDER INHALT:
-{content}
-
-🚨 DEINE AUFGABEN:
-
-1. QUALITÄTS-ANALYSE:
-✅ Struktur prüfen: Lernziele, Hierarchie, Beispiele
-✅ Didaktik bewerten: Verständlichkeit, Progression
-✅ Konsistenz validieren: Terminologie, Sprache
-
-2. SOFORTIGE VERBESSERUNG:
-✅ Fehlende Lernziele ergänzen (3-5 pro Kapitel)
-✅ Beispiele hinzufügen (min. 2 pro Hauptkonzept)
-✅ Terminologie vereinheitlichen
-✅ Sätze verkürzen (max. 20 Wörter)
-✅ Zusammenfassungen ergänzen
-
-⚡ KRITISCH WICHTIG:
-Gib den VOLLSTÄNDIGEN, VERBESSERTEN KURS aus - NICHT das Assessment!
-
-AUSGABE: Der komplette, qualitätssichere Kurs in Markdown-Format mit allen Verbesserungen."""
+            return QUALITY_REVIEW_PROMPT_TEMPLATE.format(content=content)
     
     def request_user_feedback(self, content: str, question: str, stage: str) -> str:
         """Bittet User um Feedback im Chat"""
@@ -1338,43 +2014,116 @@ Bitte geben Sie Ihre Freigabe oder vorschlagen Sie Änderungen."""
             return f"Die Wissensbasis für '{query}' ist momentan nicht verfügbar. Ich erstelle den Inhalt basierend auf allgemeinem Wissen."
     
     def _room(self):
-        """Bestimmt den korrekten SocketIO-Raum."""
-        if self.session_id:
-            return f'session_{self.session_id}'
-        if self.project_id:
-            return f'project_{self.project_id}'
-        return None
+        """Bestimmt den korrekten SocketIO-Raum (in __init__ vorberechnet)."""
+        return self._room_name
+    
+    def _emit_worker(self):
+        """
+        Emitter-Thread: sendet die gepufferten SocketIO-Events in Einreihungs-Reihenfolge.
+        PERFORMANCE: Events für denselben Raum innerhalb von EMIT_COALESCE_SECONDS gehen als ein 'batch'-Emit raus
+        """
+        carry = None
+        stopping = False
+        while not stopping:
+            item = carry if carry is not None else self._emit_queue.get()
+            carry = None
+            if item is None:
+                break
+            
+            batch = [item]
+            room = item[2]
+            # Nicht bündelbare Events (große Inhalts-Teilstücke) gehen einzeln raus
+            deadline = time.monotonic() + EMIT_COALESCE_SECONDS if item[3] else 0
+            while len(batch) < EMIT_BATCH_MAX_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._emit_queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                if nxt[2] != room or not nxt[3]:
+                    # Anderer Raum oder nicht bündelbar: Batch abschließen, Event im nächsten Durchlauf senden
+                    carry = nxt
+                    break
+                batch.append(nxt)
+            
+            self._send_emit_batch(batch, room)
+        
+        # Events, die noch kurz vor dem Umschalten auf Direktversand eingereiht wurden, nicht verlieren
+        while True:
+            try:
+                item = self._emit_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self._send_emit_batch([item], item[2])
+    
+    def _send_emit_batch(self, batch, room):
+        """Sendet ein einzelnes Event unverändert, mehrere als ein 'batch'-Event (Frontend verteilt die Einträge)"""
+        if len(batch) == 1:
+            event, payload = batch[0][:2]
+        else:
+            event = 'batch'
+            payload = [{'event': e, 'data': p} for e, p, _, _ in batch]
+        try:
+            self.socketio.emit(event, payload, room=room)
+        except Exception as e:
+            logger.warning(f"SocketIO emit error ({event}): {e}")
+    
+    def _emit(self, event, payload, room, droppable=False, coalesce=True):
+        """
+        Reiht ein SocketIO-Event ein. Bei voller Queue werden droppable Events (Token-Deltas) verworfen.
+        coalesce=False sendet das Event nie als Teil eines 'batch'-Emits.
+        """
+        item = (event, payload, room, coalesce)
+        if self._emit_stopped:
+            # Emitter-Thread beendet (Orchestrator bereinigt): synchron senden statt in eine tote Queue
+            self._send_emit_batch([item], room)
+            return
+        try:
+            self._emit_queue.put_nowait(item)
+        except queue.Full:
+            if droppable:
+                return
+            try:
+                self._emit_queue.put(item, timeout=EMIT_QUEUE_PUT_TIMEOUT_SECONDS)
+            except queue.Full:
+                logger.warning(f"⚠️ Emit-Queue voll, Event verworfen: {event} (room {room})")
     
-    # SocketIO Hilfsfunktionen (unverändert)
+    # SocketIO Hilfsfunktionen
     def emit_message(self, message, sender="assistant", metadata=None):
         """Sendet Nachricht an Chat"""
         room = self._room()
         logger.info(f"📡 EMIT MESSAGE to room {room}: {message[:100]}...")
-        self.socketio.emit('new_message', {
+        self._emit('new_message', {
             'sender': 'KI-Assistant' if sender == 'assistant' else sender,
             'message': message,
-            'timestamp': datetime.now().strftime('%H:%M:%S'),
+            'timestamp': _now_hms(),
             'type': sender,
             'metadata': metadata or {}
-        }, room=room)
+        }, room)
     
     def emit_status(self, status):
         """Sendet Status-Update"""
         room = self._room()
         logger.info(f"📡 EMIT STATUS to room {room}: {status}")
-        self.socketio.emit('status_update', {
+        self._emit('status_update', {
             'status': status,
-            'timestamp': datetime.now().strftime('%H:%M:%S')
-        }, room=room)
+            'timestamp': _now_hms()
+        }, room)
     
     def emit_error(self, error):
         """Sendet Fehler-Nachricht"""
         room = self._room()
         logger.error(f"📡 EMIT ERROR to room {room}: {error}")
-        self.socketio.emit('error_message', {
+        self._emit('error_message', {
             'error': error,
-            'timestamp': datetime.now().strftime('%H:%M:%S')
-        }, room=room)
+            'timestamp': _now_hms()
+        }, room)
     
     def set_chat_mode(self, mode):
         """Setzt den Chat-Modus (collaborative/autonomous)"""
@@ -1383,12 +2132,13 @@ Bitte geben Sie Ihre Freigabe oder vorschlagen Sie Änderungen."""
 
     def _safe_encode(self, text: str) -> str:
         """Encodes large text blocks as BASE64 to avoid JSON issues"""
-        return "BASE64:" + base64.b64encode(text.encode("utf-8")).decode("ascii")
+        return _BASE64_PREFIX + _b64.b64encode(text.encode("utf-8")).decode("ascii")
 
     def _safe_decode(self, text: str) -> str:
-        if text.startswith("BASE64:"):
+        if text.startswith(_BASE64_PREFIX):
             try:
-                return base64.b64decode(text[7:].encode("ascii")).decode("utf-8", errors="ignore")
+                # b64decode nimmt ASCII-str direkt, spart die Zwischenkopie als bytes
+                return _b64.b64decode(text[len(_BASE64_PREFIX):]).decode("utf-8", errors="ignore")
             except Exception:
                 return text  # fallback
         return text
@@ -1396,82 +2146,53 @@ Bitte geben Sie Ihre Freigabe oder vorschlagen Sie Änderungen."""
     def _emit_course_content_update(self, stage, content):
         """Sendet Kursinhalt-Updates an das Frontend für das Ergebnis-Fenster"""
         if self.socketio and self.session_id:
-            # Decode content if it's base64 encoded
-            display_content = self._safe_decode(content) if content.startswith('BASE64:') else content
+            # Decode content if it's base64 encoded (Präfix-Prüfung erfolgt in _safe_decode)
+            display_content = self._safe_decode(content)
             
-            self.socketio.emit('course_content_update', {
-                'stage': stage,
-                'content': display_content,
-                'timestamp': datetime.now().strftime('%H:%M:%S')
-            }, room=f'session_{self.session_id}')
+            # Große Kurse in Teilstücken senden statt als ein riesiges Frame (Frontend setzt sie wieder zusammen)
+            total_chunks = max(1, -(-len(display_content) // COURSE_CONTENT_CHUNK_CHARS))
+            timestamp = _now_hms()
+            for chunk_index in range(total_chunks):
+                start = chunk_index * COURSE_CONTENT_CHUNK_CHARS
+                self._emit('course_content_update', {
+                    'stage': stage,
+                    'content': display_content[start:start + COURSE_CONTENT_CHUNK_CHARS],
+                    'chunk_index': chunk_index,
+                    'total_chunks': total_chunks,
+                    'final': chunk_index == total_chunks - 1,
+                    'timestamp': timestamp
+                }, self._session_room, coalesce=total_chunks == 1)
 
     def emit_workflow_update(self, data):
         """Sendet Workflow-Updates an das Frontend"""
         if self.socketio and self.session_id:
-            self.socketio.emit('workflow_update', data, room=f'session_{self.session_id}')
+            # Token-Deltas dürfen bei Rückstau verworfen werden, alle anderen Updates nicht
+            self._emit('workflow_update', data, self._session_room, droppable=data.get('type') == 'agent_token')
 
     def _generate_improvement_instructions(self, quality_scores):
         """Generiert spezifische Verbesserungs-Anweisungen basierend auf Quality-Scores"""
         improvements = []
         
-        # Extract individual scores
-        structure_score = quality_scores.get('component_scores', {}).get('structure', {}).get('score', 0)
-        readability_score = quality_scores.get('component_scores', {}).get('readability', {}).get('score', 0) 
-        consistency_score = quality_scores.get('component_scores', {}).get('consistency', {}).get('score', 0)
+        # Extract individual scores (component_scores nur einmal nachschlagen)
+        component_scores = quality_scores.get('component_scores') or {}
         overall_score = quality_scores.get('overall_score', 0)
         
-        # Structure improvements
-        if structure_score < 7.0:
-            improvements.append(f"""
-🏗️ STRUKTUR-VERBESSERUNG (aktuell: {structure_score:.1f}/10):
-- Füge 3-5 konkrete Lernziele pro Hauptkapitel hinzu
-- Erweitere Beispiele: MINIMUM 2 pro Hauptkonzept
-- Ergänze Zusammenfassungen am Ende jeder Sektion
-- Verbessere Nummerierung und Hierarchie-Struktur
-""")
-        
-        # Readability improvements  
-        if readability_score < 7.0:
-            improvements.append(f"""
-📖 LESBARKEITS-VERBESSERUNG (aktuell: {readability_score:.1f}/10):
-- Teile lange Sätze auf (max. 20 Wörter)
-- Erkläre Fachbegriffe beim ersten Auftreten
-- Vereinfache komplexe Formulierungen
-- Füge mehr Zwischenüberschriften ein
-""")
-        
-        # Consistency improvements
-        if consistency_score < 7.0:
-            improvements.append(f"""
-🎯 KONSISTENZ-VERBESSERUNG (aktuell: {consistency_score:.1f}/10):
-- Verwende Fachbegriffe durchgehend einheitlich
-- Standardisiere Format und Tonalität  
-- Korrigiere widersprüchliche Aussagen
-- Vereinheitliche Beispiel-Struktur
-""")
+        # Structure, readability and consistency improvements
+        for component, template in _COMPONENT_IMPROVEMENT_TEMPLATES:
+            score = (component_scores.get(component) or {}).get('score', 0)
+            if score < 7.0:
+                improvements.append(template.format(score=score))
         
         # Overall quality enforcement
         if overall_score < 7.0:
-            improvements.append(f"""
-⚠️ QUALITÄTS-GATE: Gesamt-Score {overall_score:.1f}/10 nicht ausreichend!
-ZIEL: Mindestens 7.5/10 für Production-Release erforderlich.
-Führe ALLE oben genannten Verbesserungen systematisch durch.
-""")
+            improvements.append(QUALITY_GATE_TEMPLATE.format(score=overall_score))
         
         return "\n".join(improvements) if improvements else "✅ Qualität ausreichend - keine Verbesserungen erforderlich."
 
     def _is_course_creation_complete(self, response: str) -> bool:
         """Prüft, ob die KI-Antwort ein Indikator für das Abschluss des Kurserstellungsprozesses ist."""
-        # More comprehensive completion indicators
-        completion_indicators = [
-            "Kurs wurde erfolgreich erstellt",
-            "Der Kurs ist jetzt bereit",
-            "Kurserstellung abgeschlossen",
-            "Ihr Kurs ist fertig",
-            "Der komplette Kurs"
-        ]
-        
-        return any(indicator in response for indicator in completion_indicators)
+        # Ein Durchlauf über die Antwort statt ein Substring-Scan pro Indikator
+        return _COURSE_COMPLETE_RE.search(response) is not None
 
     def _save_course_to_database(self, content: str):
         """Speichert den erstellten Kursinhalt in der Datenbank."""
@@ -1484,10 +2205,14 @@ Führe ALLE oben genannten Verbesserungen systematisch durch.
             # CRITICAL FIX: Ensure we're in Flask app context
             with current_app.app_context():
                 
-                # Extract course metadata from content
-                title = self._extract_course_title(content)
-                description = self._extract_course_description(content)
-                topic = self._extract_course_topic(content)
+                # Extract course metadata from content (ein Durchlauf für alle Felder)
+                parsed = self._parse_course(content)
+                title = parsed['title']
+                description = parsed['description']
+                topic = parsed['topic']
+                sections = parsed['sections']
+                content_len = len(content)
+                n_sections = len(sections)
                 
                 logger.info(f"🎓 Saving course: '{title}' for user {self.session_id}")
                 
@@ -1499,7 +2224,7 @@ Führe ALLE oben genannten Verbesserungen systematisch durch.
                     description=description,
                     course_topic=topic,
                     full_content=content,
-                    content_length=len(content),
+                    content_length=content_len,
                     status='draft'  # Set as draft initially
                 )
                 
@@ -1507,43 +2232,37 @@ Führe ALLE oben genannten Verbesserungen systematisch durch.
                 db.session.flush()  # Get the course ID
                 
                 # Extract and save course sections if possible
-                sections = self._extract_course_sections(content)
-                for i, section in enumerate(sections):
-                    course_section = CourseSection(
-                        course_id=new_course.id,
-                        section_title=section.get('title', f'Kapitel {i+1}'),
-                        section_content=section.get('content', ''),
-                        section_order=i + 1,
-                        section_type='chapter'
+                # PERFORMANCE: Ein Multi-Row-INSERT statt ein ORM-Objekt pro Kapitel
+                if sections:
+                    CourseSection.bulk_insert(
+                        db.session,
+                        [
+                            {
+                                'course_id': new_course.id,
+                                'section_title': section.get('title', f'Kapitel {i+1}'),
+                                'section_content': section.get('content', ''),
+                                'section_order': i + 1,
+                                'section_type': 'chapter'
+                            }
+                            for i, section in enumerate(sections)
+                        ]
                     )
-                    db.session.add(course_section)
                 
                 db.session.commit()
                 
-                logger.info(f"✅ Course saved with ID {new_course.id}: '{title}' ({len(sections)} sections)")
+                logger.info(f"✅ Course saved with ID {new_course.id}: '{title}' ({n_sections} sections)")
                 
                 # Store course ID for follow-up messages
                 self.last_saved_course_id = new_course.id
                 self.last_saved_course_title = title
                 
                 # Send helpful completion message to user
-                completion_message = f"""✅ **Kurs erfolgreich gespeichert!**
-
-**📚 {title}**
-- **Kapitel:** {len(sections)}
-- **Umfang:** {len(content):,} Zeichen
-- **Status:** Entwurf
-
-**🔗 Wo finde ich meinen Kurs?**
-➜ [Zu "Meine Kurse"](/courses) - Alle gespeicherten Kurse
-➜ [Diesen Kurs anzeigen](/courses/{new_course.id}) - Direkt zum Kurs
-
-**📥 Aktionen:**
-- Download als Textdatei
-- In Zwischenablage kopieren
-- Kurs bearbeiten oder veröffentlichen
-
-Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!"""
+                completion_message = COURSE_SAVED_MESSAGE_TEMPLATE.format(
+                    title=title,
+                    n_sections=n_sections,
+                    content_len=content_len,
+                    course_id=new_course.id
+                )
 
                 # Emit completion message
                 self.emit_message(completion_message, "assistant")
@@ -1554,8 +2273,8 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                     'course_id': new_course.id,
                     'title': title,
                     'status': 'saved',
-                    'sections_count': len(sections),
-                    'content_length': len(content),
+                    'sections_count': n_sections,
+                    'content_length': content_len,
                     'course_url': f'/courses/{new_course.id}'
                 })
                 
@@ -1563,22 +2282,46 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
             logger.error(f"❌ Error saving course to database: {type(e).__name__}: {str(e)}")
             self.emit_error(f"❌ Fehler beim Speichern des Kurses: {str(e)}")
             
+    def _parse_course(self, content: str) -> dict:
+        """
+        PERFORMANCE: Extrahiert Titel, Beschreibung, Thema und Kapitel mit nur einem content.split
+        (statt einem Split pro Extraktor und doppelter Titel-Erkennung für das Thema)
+        """
+        lines = content.split('\n')
+        title = self._course_title_from_lines(lines)
+        return {
+            'title': title,
+            'description': self._course_description_from_lines(lines),
+            'topic': self._course_topic_from_title(title),
+            'sections': self._course_sections_from_lines(lines)
+        }
+    
     def _extract_course_title(self, content: str) -> str:
         """Extract course title from content"""
-        # Look for markdown h1 or common title patterns
-        title_patterns = [
-            r'^#\s+(.+?)$',  # Markdown H1
-            r'^\*\*(.+?)\*\*$',  # Bold title
-            r'^(.+?)\s*(?:Kurs|Course)',  # Text before "Kurs" or "Course"
-        ]
-        
-        lines = content.split('\n')
+        return self._course_title_from_lines(content.split('\n'))
+    
+    def _extract_course_description(self, content: str) -> str:
+        """Extract course description from content"""
+        return self._course_description_from_lines(content.split('\n'))
+    
+    def _extract_course_topic(self, content: str) -> str:
+        """Extract course topic from content"""
+        return self._course_topic_from_title(self._extract_course_title(content))
+    
+    def _extract_course_sections(self, content: str) -> list:
+        """Extract course sections from content"""
+        # Zeilen direkt aus dem Puffer streamen statt eine vollständige Zeilenliste anzulegen
+        return self._course_sections_from_lines(io.StringIO(content, newline='\n'))
+    
+    def _course_title_from_lines(self, lines: list) -> str:
+        """Ermittelt den Kurstitel aus den bereits gesplitteten Zeilen"""
+        # Look for markdown h1 or common title patterns (_COURSE_TITLE_PATTERNS)
         for line in lines[:10]:  # Check first 10 lines
             line = line.strip()
             if not line:
                 continue
-            for pattern in title_patterns:
-                match = re.search(pattern, line, re.MULTILINE)
+            for pattern in _COURSE_TITLE_PATTERNS:
+                match = pattern.search(line)
                 if match:
                     return match.group(1).strip()
         
@@ -1589,9 +2332,8 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                 
         return f"KI-Kurs erstellt am {datetime.now().strftime('%Y-%m-%d %H:%M')}"
     
-    def _extract_course_description(self, content: str) -> str:
-        """Extract course description from content"""
-        lines = content.split('\n')
+    def _course_description_from_lines(self, lines: list) -> str:
+        """Ermittelt die Kursbeschreibung (bis zu 3 Zeilen nach dem Titel)"""
         description_lines = []
         
         # Look for description after title
@@ -1611,28 +2353,21 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
         
         return ' '.join(description_lines)[:500] if description_lines else "KI-generierter Kurs"
     
-    def _extract_course_topic(self, content: str) -> str:
-        """Extract course topic from content"""
+    def _course_topic_from_title(self, title: str) -> str:
+        """Ordnet den Kurs anhand von Schlüsselwörtern im Titel einem Thema zu"""
         # This could be enhanced to extract from the original user input
         # For now, try to extract from the content
         if hasattr(self, '_original_topic') and self._original_topic:
             return self._original_topic
         
-        # Try to extract from title
-        title = self._extract_course_title(content)
-        if 'AI' in title or 'KI' in title or 'Agent' in title:
-            return 'AI & Machine Learning'
-        elif 'Python' in title or 'Programm' in title:
-            return 'Programming'
-        elif 'Business' in title or 'Marketing' in title:
-            return 'Business'
-        else:
-            return 'Allgemein'
+        for keywords, topic in _COURSE_TOPIC_KEYWORDS:
+            if any(keyword in title for keyword in keywords):
+                return topic
+        return 'Allgemein'
     
-    def _extract_course_sections(self, content: str) -> list:
-        """Extract course sections from content"""
+    def _course_sections_from_lines(self, lines) -> list:
+        """Zerlegt die Zeilen (Liste oder beliebiges Zeilen-Iterable) anhand von Überschriften in Kapitel"""
         sections = []
-        lines = content.split('\n')
         current_section = None
         current_content = []
         
@@ -1641,8 +2376,8 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
             
             # Detect section headers (markdown H2, H3, or numbered)
             if (line.startswith('##') or 
-                re.match(r'^\d+\.', line) or 
-                re.match(r'^[A-Z][^.]*:$', line)):
+                _SECTION_NUMBERED_RE.match(line) or 
+                _SECTION_LABEL_RE.match(line)):
                 
                 # Save previous section
                 if current_section:
@@ -1667,18 +2402,20 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
         
         return sections
     
-    def _call_assistant_by_id(self, assistant_id, arguments, custom_prompt=None):
+    def _call_assistant_by_id(self, assistant_id, arguments, custom_prompt=None, assistant=None):
         """
         NEW FLEXIBLE SYSTEM: Ruft Assistant direkt über ID auf (statt Rolle)
         Ermöglicht flexible Workflow-Zuordnung über UI
+        (assistant: bereits geladenes Assistant-Objekt, spart die Abfrage pro Aufruf)
         """
         try:
             # Get assistant from database by ID
-            from models import Assistant
+            from models import get_assistant
             from flask import current_app
             
             with current_app.app_context():
-                assistant = Assistant.query.get(assistant_id)
+                if assistant is None:
+                    assistant = get_assistant(assistant_id)
                 if not assistant:
                     logger.error(f"❌ Assistant with ID {assistant_id} not found")
                     return f"Assistant mit ID {assistant_id} nicht gefunden."
@@ -1695,7 +2432,7 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                     'assistant_name': assistant.name,
                     'assistant_id': assistant_id,
                     'model': assistant.model,
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
+                    'timestamp': _now_hms()
                 })
                 
                 # Use custom prompt if provided, otherwise create based on arguments
@@ -1710,7 +2447,7 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                     'type': 'assistant_prompt',
                     'assistant_name': assistant.name,
                     'prompt': prompt[:200] + "..." if len(prompt) > 200 else prompt,
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
+                    'timestamp': _now_hms()
                 })
                 
                 logger.info(f"🚀 Calling assistant {assistant.name} (ID: {assistant_id})")
@@ -1734,7 +2471,7 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                     'type': 'assistant_response',
                     'assistant_name': assistant.name,
                     'response': result[:300] + "..." if len(result) > 300 else result,
-                    'timestamp': datetime.now().strftime('%H:%M:%S')
+                    'timestamp': _now_hms()
                 })
                 
                 self.emit_status(f"✅ {assistant.name} abgeschlossen")
@@ -1750,20 +2487,27 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
         NEW: Execute a complete workflow by ID with flexible assistant assignment
         """
         try:
-            from models import Workflow, WorkflowStep
+            from models import db, Assistant, WorkflowStep, get_workflow
+            from sqlalchemy.orm import selectinload
             from flask import current_app
             
             with current_app.app_context():
-                workflow = Workflow.query.get(workflow_id)
+                workflow = get_workflow(workflow_id)
                 if not workflow or not workflow.is_active:
                     logger.error(f"❌ Workflow {workflow_id} not found or inactive")
                     return f"Workflow {workflow_id} nicht gefunden oder inaktiv"
                 
-                # Get workflow steps ordered by order_index
-                steps = WorkflowStep.query.filter_by(
-                    workflow_id=workflow_id, 
-                    is_enabled=True
-                ).order_by(WorkflowStep.order_index).all()
+                # Get workflow steps ordered by order_index (Assistants per selectin in einer Query mitgeladen,
+                # nur die Spalten, die _call_assistant_by_id liest)
+                steps = db.session.scalars(
+                    db.select(WorkflowStep)
+                    .where(WorkflowStep.workflow_id == workflow_id, WorkflowStep.is_enabled == True)  # noqa: E712
+                    .options(selectinload(WorkflowStep.assistant).load_only(
+                        Assistant.name, Assistant.is_active, Assistant.model, Assistant.instructions,
+                        Assistant.temperature, Assistant.max_tokens
+                    ))
+                    .order_by(WorkflowStep.order_index)
+                ).all()
                 
                 if not steps:
                     logger.warning(f"⚠️ No enabled steps found for workflow {workflow_id}")
@@ -1793,7 +2537,8 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
                     step_result = self._call_assistant_by_id(
                         assistant_id=step.assistant_id,
                         arguments=step_arguments,
-                        custom_prompt=step.custom_prompt
+                        custom_prompt=step.custom_prompt,
+                        assistant=step.assistant
                     )
                     
                     if "Fehler" in step_result or "Error" in step_result:
@@ -1820,46 +2565,26 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
         message_lower = message.lower().strip()
         message_len = len(message)
         
-        # Greeting patterns
-        greeting_patterns = [
-            'hallo', 'hi', 'hey', 'guten tag', 'guten morgen', 'guten abend',
-            'servus', 'moin', 'hallöchen', 'grüß gott', 'grüß dich'
-        ]
-        
-        # Small talk patterns
-        small_talk_patterns = [
-            'wie geht', 'was machst du', 'was kannst du', 'wer bist du',
-            'danke', 'dankeschön', 'vielen dank', 'super', 'toll', 'prima',
-            'ok', 'okay', 'alles klar', 'verstehe', 'gut'
-        ]
-        
-        # Course request patterns  
-        course_patterns = [
-            'kurs', 'erstell', 'training', 'schulung', 'lerninhalt',
-            'lektion', 'tutorial', 'workshop', 'seminar', 'modul'
-        ]
-        
-        # Check for greetings (prioritize short messages)
-        if message_len <= 20:
-            for pattern in greeting_patterns:
-                if pattern in message_lower:
-                    return 'greeting'
-        
-        # Check for small talk
-        for pattern in small_talk_patterns:
-            if pattern in message_lower:
-                return 'small_talk'
-        
-        # Check for course requests
-        for pattern in course_patterns:
-            if pattern in message_lower:
-                return 'course_request'
-        
-        # Default classification based on length and content
-        if message_len <= 30 and not any(p in message_lower for p in course_patterns):
+        if _INTENT_AUTOMATON is not None:
+            # Ein Durchlauf liefert alle enthaltenen Kategorien (auch überlappende Treffer)
+            found = {category for _, category in _INTENT_AUTOMATON.iter(message_lower)}
+            if message_len <= 20 and 'greeting' in found:
+                return 'greeting'
+            for category in ('small_talk', 'course_request'):
+                if category in found:
+                    return category
+            return 'small_talk' if message_len <= 30 else 'other'
+        
+        # Greetings nur bei kurzen Nachrichten, danach Small Talk, dann Kursanfragen
+        if message_len <= 20 and _GREETING_RE.search(message_lower):
+            return 'greeting'
+        if _SMALL_TALK_RE.search(message_lower):
             return 'small_talk'
+        if _COURSE_RE.search(message_lower):
+            return 'course_request'
         
-        return 'other'
+        # Default classification based on length (Kurs-Keywords sind hier bereits ausgeschlossen)
+        return 'small_talk' if message_len <= 30 else 'other'
     
     def _handle_simple_response(self, message: str, intent: str):
         """
@@ -1868,33 +2593,17 @@ Ihr Kurs wurde sicher in der Datenbank gespeichert und ist jederzeit abrufbar!""
         self._update_activity()
         
         if intent == 'greeting':
-            responses = [
-                "Hallo! Schön, Sie zu sehen. Wie kann ich Ihnen heute helfen?",
-                "Hi! Ich bin Ihr KI-Assistent für die Kurserstellung. Was kann ich für Sie tun?",
-                "Guten Tag! Möchten Sie einen neuen Kurs erstellen oder haben Sie Fragen?",
-                "Hallo! Ich freue mich, Ihnen bei der Kurserstellung helfen zu können."
-            ]
+            responses = self._GREETING_RESPONSES
         elif intent == 'small_talk':
-            if any(word in message.lower() for word in ['danke', 'dankeschön', 'vielen dank']):
-                responses = [
-                    "Gerne! Falls Sie weitere Fragen haben, bin ich da.",
-                    "Sehr gerne! Kann ich Ihnen noch bei etwas anderem helfen?",
-                    "Freut mich, dass ich helfen konnte!"
-                ]
-            elif any(word in message.lower() for word in ['wie geht', 'was machst du', 'was kannst du']):
-                responses = [
-                    "Ich bin Ihr KI-Assistent für die automatische Kurserstellung. Ich kann professionelle Lerninhalte zu jedem Thema erstellen.",
-                    "Mir geht es gut, danke! Ich helfe dabei, hochwertige Online-Kurse zu entwickeln. Haben Sie ein bestimmtes Thema im Kopf?",
-                    "Ich spezialisiere mich auf die Erstellung von strukturierten Lerninhalten mit didaktischer Optimierung."
-                ]
+            message_lower = message.lower()  # einmal statt pro Keyword-Liste
+            if _THANKS_RE.search(message_lower):
+                responses = self._THANKS_RESPONSES
+            elif _ABOUT_ASSISTANT_RE.search(message_lower):
+                responses = self._ABOUT_ASSISTANT_RESPONSES
             else:
-                responses = [
-                    "Das freut mich! Möchten Sie einen Kurs zu einem bestimmten Thema erstellen?",
-                    "Schön! Womit kann ich Ihnen konkret helfen?",
-                    "Wenn Sie Fragen haben oder einen Kurs erstellen möchten, sagen Sie einfach Bescheid!"
-                ]
+                responses = self._SMALL_TALK_RESPONSES
         else:
-            responses = ["Wie kann ich Ihnen helfen?"]
+            responses = self._DEFAULT_RESPONSES
         
         # Select first response (can be randomized later)
         response = responses[0]
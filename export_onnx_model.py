@@ -0,0 +1,47 @@
+"""
+Einmaliger Export des Embedding-Modells nach ONNX (INT8) für den optionalen ONNX-Runtime-Encoder
+Als Build-Schritt oder manuell ausführen, nicht zur Laufzeit:
+
+    pip install -r requirements_onnx.txt
+    python export_onnx_model.py [ZIELVERZEICHNIS]
+
+Der Encoder wird nur mit KIKI_ONNX_EMBEDDINGS=1 und vorhandenem Modell in ONNX_MODEL_DIR verwendet.
+"""
+
+import os
+import sys
+import logging
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+from optimum.onnxruntime.configuration import AutoQuantizationConfig
+from transformers import AutoTokenizer
+
+from knowledge_manager import EMBEDDING_MODEL_NAME, ONNX_MODEL_DIR, ONNX_MODEL_FILE
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def export_onnx_model(model_dir: str = ONNX_MODEL_DIR):
+    """Exportiert MiniLM nach ONNX und quantisiert dynamisch auf INT8 (überspringt vorhandene Exporte)"""
+    model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+    if os.path.exists(model_path):
+        logger.info(f"ℹ️ ONNX model already exists: {model_path}")
+        return model_path
+    
+    logger.info(f"🔄 Exporting {EMBEDDING_MODEL_NAME} to ONNX (INT8) in {model_dir}...")
+    model = ORTModelForFeatureExtraction.from_pretrained(EMBEDDING_MODEL_NAME, export=True)
+    model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME).save_pretrained(model_dir)
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantizer.quantize(
+        save_dir=model_dir,
+        quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    )
+    logger.info(f"✅ ONNX INT8 model written to {model_path}")
+    return model_path
+
+if __name__ == '__main__':
+    export_onnx_model(sys.argv[1] if len(sys.argv) > 1 else ONNX_MODEL_DIR)
@@ -3,9 +3,29 @@ Initialisiert die spezifizierten OpenAI Assistenten in der Datenbank
 """
 
 import os
+import sys
 from app_simplified import app, db, User
 from werkzeug.security import generate_password_hash
 
+# (username, password, role) der Standard-User
+DEFAULT_USERS = (
+    ('admin', 'admin123', 'admin'),
+    ('demo', 'demo123', 'user'),
+)
+
+# Abschlussausgabe von init_assistants_and_users (ein Write statt einzelner prints)
+INIT_SUMMARY = """✅ Default users initialized
+
+🤖 OpenAI Assistants Configuration:
+The following assistants are configured in simple_orchestrator.py:
+- Supervisor: asst_19FlW2QtTAIb7Z96f3ukfSre (gpt-4.1-nano)
+- Der Autor: asst_UCpHRYdDK2uPsb7no8Zw5Z0p (gpt-4.1-nano)
+- Der Pädagoge: asst_tmj7Nz75MSwjPSrBf4KV2EIt (gpt-4.1-nano)
+- Der Prüfer: asst_qH5a6MsVByLHP2ZLQ8gT8jg0 (gpt-4.1-nano)
+
+✅ Database initialization complete!
+"""
+
 def init_assistants_and_users():
     """Initialize database with specified assistants and default users"""
     
@@ -14,36 +34,26 @@ def init_assistants_and_users():
         db.create_all()
         print("✅ Database tables created")
         
-        # Create default admin user if not exists
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(
-                username='admin',
-                password_hash=generate_password_hash('admin123'),
-                role='admin'
-            )
-            db.session.add(admin_user)
-            print("✅ Admin user created (admin/admin123)")
-            
-        # Create default demo user if not exists
-        if not User.query.filter_by(username='demo').first():
-            demo_user = User(
-                username='demo',
-                password_hash=generate_password_hash('demo123'),
-                role='user'
-            )
-            db.session.add(demo_user)
-            print("✅ Demo user created (demo/demo123)")
+        # Create default users if not exists (ein SELECT für alle, Passwort-Hash nur für neue User)
+        existing = set(db.session.execute(
+            db.select(User.username).where(User.username.in_([username for username, _, _ in DEFAULT_USERS]))
+        ).scalars())
+        new_users = []
+        for username, password, role in DEFAULT_USERS:
+            if username in existing:
+                continue
+            new_users.append(User(
+                username=username,
+                password_hash=generate_password_hash(password),
+                role=role
+            ))
+            print(f"✅ {username.capitalize()} user created ({username}/{password})")
+        db.session.add_all(new_users)
         
         db.session.commit()
-        print("✅ Default users initialized")
         
-        print("\n🤖 OpenAI Assistants Configuration:")
-        print("The following assistants are configured in simple_orchestrator.py:")
-        print("- Supervisor: asst_19FlW2QtTAIb7Z96f3ukfSre (gpt-4.1-nano)")
-        print("- Der Autor: asst_UCpHRYdDK2uPsb7no8Zw5Z0p (gpt-4.1-nano)")
-        print("- Der Pädagoge: asst_tmj7Nz75MSwjPSrBf4KV2EIt (gpt-4.1-nano)")
-        print("- Der Prüfer: asst_qH5a6MsVByLHP2ZLQ8gT8jg0 (gpt-4.1-nano)")
-        print("\n✅ Database initialization complete!")
+        # Zusammenfassung mit einem einzigen Schreibvorgang ausgeben
+        sys.stdout.write(INIT_SUMMARY)
 
 if __name__ == '__main__':
     init_assistants_and_users()
\ No newline at end of file
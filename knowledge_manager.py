@@ -12,9 +12,15 @@ Features:
 """
 
 import os
+import re
 import sqlite3
 import hashlib
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import closing, contextmanager
 from typing import List, Dict, Any, Optional, Tuple, Set
 from pathlib import Path
 from datetime import datetime
@@ -24,17 +30,184 @@ from io import BytesIO
 import PyPDF2
 import docx
 
+# PERFORMANCE: pypdfium2 (PDFium, C++) für die PDF-Textextraktion, Fallback auf PyPDF2
+try:
+    import pypdfium2 as pdfium
+    _PDFIUM_AVAILABLE = True
+except ImportError:
+    _PDFIUM_AVAILABLE = False
+
 # RAG Components
 import chromadb
 from sentence_transformers import SentenceTransformer
 import numpy as np
 
+# PERFORMANCE: ONNX Runtime + INT8-Quantisierung für MiniLM, Fallback auf SentenceTransformer (PyTorch)
+# (Abhängigkeiten: requirements_onnx.txt, Export des Modells: export_onnx_model.py)
+try:
+    import onnxruntime
+    from transformers import AutoTokenizer
+    _ONNX_AVAILABLE = True
+except ImportError:
+    _ONNX_AVAILABLE = False
+
 # Configuration
 from dotenv import load_dotenv
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Satzgrenzen für das Chunking: Whitespace nach '.', '!' oder '?'
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
+EMBEDDING_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+EMBEDDING_MAX_SEQ_LENGTH = 256  # Wie SentenceTransformer('all-MiniLM-L6-v2').max_seq_length
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'minilm-int8'))
+ONNX_MODEL_FILE = 'model_quantized.onnx'
+# ONNX-Encoder nur auf ausdrücklichen Wunsch: INT8-Embeddings weichen von den FP32-Vektoren bestehender
+# Collections ab - beim Umschalten müssen die Wissensbasen neu indexiert (Dateien neu hochgeladen) werden
+KIKI_ONNX_EMBEDDINGS = os.getenv('KIKI_ONNX_EMBEDDINGS') == '1'
+
+# PERFORMANCE: Cache für knowledge_lookup-Ergebnisse (LRU + TTL), Key: (project_id, query)
+KNOWLEDGE_CACHE_MAX_ENTRIES = 256
+KNOWLEDGE_CACHE_TTL_SECONDS = 15 * 60
+_knowledge_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+_knowledge_cache_lock = threading.Lock()
+
+# PERFORMANCE: Semantischer Cache für search_knowledge-Ergebnisse pro Projekt.
+# Ähnliche Query (Cosine >= Schwelle auf normalisierten Embeddings) → gecachte Treffer ohne Chroma-Query
+SEMANTIC_CACHE_MIN_SIMILARITY = 0.92
+SEMANTIC_CACHE_TTL_SECONDS = 2 * 60 * 60
+SEMANTIC_CACHE_MAX_ENTRIES_PER_PROJECT = 128
+# project_id -> [(expires_at, query_embedding, n_results, results)], älteste zuerst
+_semantic_cache: Dict[str, List[Tuple[float, np.ndarray, int, List[Dict[str, Any]]]]] = {}
+_semantic_cache_lock = threading.Lock()
+
+# PERFORMANCE: LRU-Cache für Query-Embeddings (spart den Transformer-Forward-Pass bei wiederholten Queries)
+QUERY_EMBEDDING_CACHE_MAX_ENTRIES = 1024
+# Chunks pro Forward-Pass beim Embedding (Tokenizer- und Matmul-Overhead amortisieren)
+EMBEDDING_BATCH_SIZE = 64
+# HNSW-Parameter für neue Projekt-Collections (Chroma-Defaults: M=16, construction_ef=100, search_ef=10).
+# Cosine-Space, da die Embeddings L2-normalisiert sind: 1 - distance ist dann direkt die Cosine-Similarity
+HNSW_COLLECTION_METADATA = {
+    'hnsw:space': 'cosine',
+    'hnsw:M': 24,
+    'hnsw:construction_ef': 128,
+    'hnsw:search_ef': 100,
+}
+# Chunks pro Pipeline-Schritt in _embed_and_store (Embedding von Batch k+1 überlappt das Speichern von Batch k)
+VECTOR_STORE_PIPELINE_BATCH = 4 * EMBEDDING_BATCH_SIZE
+# PERFORMANCE: Pragmas pro SQLite-Verbindung (WAL ist persistent und wird einmalig in initialize_systems gesetzt)
+SQLITE_CONNECTION_PRAGMAS = '''
+PRAGMA synchronous=NORMAL;
+PRAGMA mmap_size=268435456;
+PRAGMA temp_store=MEMORY;
+'''
+# Blockgröße beim Hashen hochgeladener Dateien (Upload-Deduplizierung)
+FILE_HASH_BLOCK_SIZE = 64 * 1024
+# PERFORMANCE: Dummy-Encode beim Start, damit die erste echte Query keine Lazy-Init-Kosten trägt (KIKI_FAST_BOOT=1 überspringt)
+EMBEDDING_WARMUP_BATCH = 8
+KIKI_FAST_BOOT = os.getenv('KIKI_FAST_BOOT') == '1'
+
+def _normalize_query(query: str) -> str:
+    """
+    Normalisiert eine Query für den Embedding-Cache (Whitespace zusammenfassen, Kleinschreibung).
+    all-MiniLM-L6-v2 ist uncased und splittet an Whitespace - das Embedding bleibt dadurch identisch.
+    """
+    return ' '.join(query.split()).lower()
+
+# Ein Store-Thread für alle ChromaDB-Writes: serialisiert die Adds und entkoppelt sie vom Embedding
+_vector_store_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='km-store')
+
+def invalidate_knowledge_cache(project_id) -> None:
+    """Verwirft gecachte knowledge_lookup-Ergebnisse eines Projekts (z.B. nach neuem Upload)"""
+    project_key = str(project_id)
+    with _knowledge_cache_lock:
+        for key in [key for key in _knowledge_cache if key[0] == project_key]:
+            del _knowledge_cache[key]
+    with _semantic_cache_lock:
+        _semantic_cache.pop(project_key, None)
+
+def _semantic_cache_get(project_id, query_embedding: np.ndarray, n_results: int) -> Optional[List[Dict[str, Any]]]:
+    """Gecachte Suchtreffer einer semantisch ähnlichen Query des Projekts (oder None)"""
+    project_key = str(project_id)
+    now = time.monotonic()
+    with _semantic_cache_lock:
+        entries = _semantic_cache.get(project_key)
+        if not entries:
+            return None
+        # Abgelaufene Einträge lazy entfernen (TTL)
+        entries[:] = [entry for entry in entries if entry[0] > now]
+        candidates = [entry for entry in entries if entry[2] == n_results]
+        if not candidates:
+            return None
+        similarities = np.stack([entry[1] for entry in candidates]) @ query_embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < SEMANTIC_CACHE_MIN_SIMILARITY:
+            return None
+        return list(candidates[best][3])
+
+def _semantic_cache_put(project_id, query_embedding: np.ndarray, n_results: int,
+                        results: List[Dict[str, Any]]) -> None:
+    """Legt Suchtreffer für eine Query im semantischen Cache des Projekts ab"""
+    expires_at = time.monotonic() + SEMANTIC_CACHE_TTL_SECONDS
+    with _semantic_cache_lock:
+        entries = _semantic_cache.setdefault(str(project_id), [])
+        entries.append((expires_at, query_embedding, n_results, results))
+        if len(entries) > SEMANTIC_CACHE_MAX_ENTRIES_PER_PROJECT:
+            del entries[0]
+
+class MiniLMEncoder:
+    """
+    INT8-quantisiertes all-MiniLM-L6-v2 auf ONNX Runtime (CPU)
+    
+    Gleicher encode-Vertrag wie SentenceTransformer.encode (float32-Array, Mean-Pooling, optional L2-normalisiert).
+    Das Modell muss vorab mit export_onnx_model.py nach ONNX_MODEL_DIR exportiert worden sein.
+    """
+    
+    def __init__(self, model_dir: str = ONNX_MODEL_DIR):
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = onnxruntime.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+    
+    def encode(self, texts: List[str], batch_size: int = 64, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, show_progress_bar: bool = False) -> np.ndarray:
+        """
+        Berechnet Satz-Embeddings als float32-Array der Form (len(texts), dim).
+        PERFORMANCE: Texte werden nach Token-Länge sortiert gebatcht (kaum Padding), das Ergebnis in Eingabe-Reihenfolge geliefert
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        # Einmal ohne Padding tokenisieren (auf EMBEDDING_MAX_SEQ_LENGTH gekürzt), Länge = Sortierschlüssel
+        encoded_all = self.tokenizer(list(texts), truncation=True, max_length=EMBEDDING_MAX_SEQ_LENGTH)
+        order = np.argsort([len(ids) for ids in encoded_all['input_ids']], kind='stable')
+        
+        batches = []
+        for start in range(0, len(order), batch_size):
+            batch_idx = order[start:start + batch_size]
+            encoded = self.tokenizer.pad(
+                {key: [values[i] for i in batch_idx] for key, values in encoded_all.items()},
+                padding='longest',
+                return_tensors='np'
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            if 'token_type_ids' in self._input_names and 'token_type_ids' not in feeds:
+                feeds['token_type_ids'] = np.zeros_like(feeds['input_ids'])
+            token_embeddings = self.session.run(None, feeds)[0]
+            
+            # Mean-Pooling über die echten Tokens (Padding maskiert)
+            mask = encoded['attention_mask'][..., np.newaxis].astype(np.float32)
+            batches.append((token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None))
+        
+        # Sortierung rückgängig machen: Zeile k der sortierten Ergebnisse gehört zu Eingabe order[k]
+        embeddings = np.empty((len(order), batches[0].shape[1]), dtype=np.float32)
+        embeddings[order] = np.concatenate(batches)
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
 class KnowledgeManager:
     """
     Vollständiges RAG-System für Kursstudio
@@ -50,10 +223,14 @@ class KnowledgeManager:
     def __init__(self, db_path: str = "kursstudio.db", vector_db_path: str = "./chroma_db"):
         self.db_path = db_path
         self.vector_db_path = vector_db_path
-        self.embedding_model: Optional[SentenceTransformer] = None
+        self.embedding_model: Optional[Any] = None  # MiniLMEncoder oder SentenceTransformer
         self.chroma_client: Optional[chromadb.PersistentClient] = None
         self.collections: Dict[str, Any] = {}
         
+        # Query-Embedding-Cache (LRU), Key: blake2b der normalisierten Query
+        self._query_emb_cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._query_emb_cache_lock = threading.Lock()
+        
         # Supported file types
         self.supported_extensions: Set[str] = {'.pdf', '.txt', '.docx'}
         self.max_file_size: int = 16 * 1024 * 1024  # 16MB
@@ -66,11 +243,27 @@ class KnowledgeManager:
     
     def initialize_systems(self) -> bool:
         """Initialisiert Embedding-Model und Vector-Datenbank"""
+        self._enable_sqlite_wal()
         try:
-            # Sentence-Transformer laden (Open Source)
-            logger.info("Loading sentence transformer model...")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Embedding-Model laden: ONNX/INT8 nur per Opt-in und mit vorab exportiertem Modell
+            # (kein Export im Request-Pfad), sonst Sentence-Transformer (Open Source)
+            self.embedding_model = None
+            onnx_model_path = os.path.join(ONNX_MODEL_DIR, ONNX_MODEL_FILE)
+            if KIKI_ONNX_EMBEDDINGS and not (_ONNX_AVAILABLE and os.path.exists(onnx_model_path)):
+                logger.warning(f"⚠️ KIKI_ONNX_EMBEDDINGS=1, but ONNX runtime or {onnx_model_path} missing "
+                               f"(run export_onnx_model.py) - using sentence transformer")
+            elif KIKI_ONNX_EMBEDDINGS:
+                try:
+                    logger.info("Loading ONNX INT8 embedding model...")
+                    self.embedding_model = MiniLMEncoder()
+                except Exception as e:
+                    logger.warning(f"⚠️ ONNX embedding model unavailable, falling back to sentence transformer: {e}")
+            if self.embedding_model is None:
+                logger.info("Loading sentence transformer model...")
+                self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
             logger.info("✅ Embedding model loaded successfully")
+            if not KIKI_FAST_BOOT:
+                self._warmup_embedding_model()
             
             # ChromaDB initialisieren
             logger.info("Initializing ChromaDB...")
@@ -88,6 +281,17 @@ class KnowledgeManager:
             self.chroma_client = None
             return False
     
+    def _warmup_embedding_model(self):
+        """Einmaliger Dummy-Forward-Pass (Kernel-Auswahl, Speicherallokation) während des Starts"""
+        try:
+            self.embedding_model.encode(["warmup"] * EMBEDDING_WARMUP_BATCH,
+                                        batch_size=EMBEDDING_WARMUP_BATCH,
+                                        convert_to_numpy=True,
+                                        show_progress_bar=False)
+            logger.info("🔥 Embedding model warmed up")
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding model warmup failed: {e}")
+    
     def process_uploaded_file(self, file_path: str, project_id: int, user_id: int, filename: str) -> Dict[str, Any]:
         """
         Verarbeitet hochgeladene Datei komplett
@@ -100,6 +304,21 @@ class KnowledgeManager:
             if not self._validate_file(file_path, filename):
                 return {"success": False, "error": "File validation failed"}
             
+            # PERFORMANCE: Identische Datei im Projekt bereits verarbeitet - Extraktion und Embeddings überspringen
+            content_hash = self._hash_file(file_path)
+            existing = self._find_processed_upload(project_id, content_hash)
+            if existing:
+                doc_id, chunks_count = existing
+                logger.info(f"♻️ File already processed, skipping re-embedding: {filename} (doc_id {doc_id})")
+                return {
+                    "success": True,
+                    "filename": filename,
+                    "chunks_count": chunks_count,
+                    "doc_id": doc_id,
+                    "duplicate": True,
+                    "preview": "Identische Datei ist bereits in der Wissensbasis vorhanden."
+                }
+            
             # Text extraction
             extracted_text = self._extract_text(file_path, filename)
             if not extracted_text:
@@ -110,14 +329,11 @@ class KnowledgeManager:
             if not chunks:
                 return {"success": False, "error": "Text chunking failed"}
             
-            # Generate embeddings
-            embeddings = self._generate_embeddings(chunks)
-            if embeddings is None:
-                return {"success": False, "error": "Embedding generation failed"}
-            
-            # Store in vector database
+            # Generate embeddings and store in vector database (überlappend in Batches)
             collection_name = f"project_{project_id}"
-            doc_id = self._store_in_vector_db(collection_name, chunks, embeddings, filename)
+            doc_id = self._embed_and_store(collection_name, chunks, filename)
+            if doc_id is None:
+                return {"success": False, "error": "Embedding generation failed"}
             
             # Update SQL database
             file_info = {
@@ -127,11 +343,15 @@ class KnowledgeManager:
                 'file_path': file_path,
                 'chunks_count': len(chunks),
                 'doc_id': doc_id,
+                'content_hash': content_hash,
                 'processed': True
             }
             
             self._update_file_database(file_info)
             
+            # Neue Inhalte: gecachte Suchergebnisse des Projekts sind veraltet
+            invalidate_knowledge_cache(project_id)
+            
             logger.info(f"✅ File processed successfully: {filename} ({len(chunks)} chunks)")
             
             return {
@@ -163,6 +383,16 @@ class KnowledgeManager:
                 logger.warning("RAG system not initialized")
                 return []
             
+            # Generate query embedding (gecacht)
+            query_embedding = self._embed_query(query)
+            n_results = min(top_k, 10)
+            
+            # Semantisch ähnliche Query bereits beantwortet: Chroma-Query überspringen
+            cached_results = _semantic_cache_get(project_id, query_embedding, n_results)
+            if cached_results is not None:
+                logger.info(f"♻️ Semantic cache hit: {len(cached_results)} results for '{query[:50]}'")
+                return cached_results
+            
             collection_name = f"project_{project_id}"
             
             # Check if collection exists
@@ -172,30 +402,35 @@ class KnowledgeManager:
                 logger.info(f"No knowledge base found for project {project_id}")
                 return []
             
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query]).tolist()
-            
             # Semantic search
             results = collection.query(
-                query_embeddings=query_embedding,
-                n_results=min(top_k, 10),
+                query_embeddings=[query_embedding.tolist()],
+                n_results=n_results,
                 include=['documents', 'metadatas', 'distances']
             )
             
-            # Format results
-            formatted_results = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results['documents'][0],
-                results['metadatas'][0], 
-                results['distances'][0]
-            )):
-                formatted_results.append({
+            # Ältere Collections nutzen den L2-Space (quadrierte Distanz = 2 - 2*cos bei normalisierten Vektoren);
+            # halbieren, damit relevance_score überall der Cosine-Similarity entspricht
+            distance_scale = 0.5 if (collection.metadata or {}).get('hnsw:space', 'l2') == 'l2' else 1.0
+            
+            # Format results (eine Comprehension über die Spalten des ersten Query-Ergebnisses)
+            formatted_results = [
+                {
                     'content': doc,
                     'source': metadata.get('filename', 'Unknown'),
                     'chunk_id': metadata.get('chunk_id', i),
-                    'relevance_score': 1 - distance,  # Convert distance to relevance
+                    'relevance_score': 1 - distance * distance_scale,  # Convert distance to relevance
                     'metadata': metadata
-                })
+                }
+                for i, (doc, metadata, distance) in enumerate(zip(
+                    results['documents'][0],
+                    results['metadatas'][0],
+                    results['distances'][0]
+                ))
+            ]
+            
+            if formatted_results:
+                _semantic_cache_put(project_id, query_embedding, n_results, formatted_results)
             
             logger.info(f"✅ Knowledge search completed: {len(formatted_results)} results for '{query[:50]}'")
             return formatted_results
@@ -207,9 +442,9 @@ class KnowledgeManager:
     def get_project_knowledge_summary(self, project_id: int) -> Dict[str, Any]:
         """Gibt Übersicht über die Wissensbasis eines Projekts"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
+            with self._db() as conn:
                 cursor = conn.cursor()
+                cursor.row_factory = sqlite3.Row
                 cursor.execute('''
                     SELECT filename, file_size, chunks_count, created_at
                     FROM uploaded_files 
@@ -232,6 +467,43 @@ class KnowledgeManager:
     
     # Internal Processing Methods
     
+    @contextmanager
+    def _db(self):
+        """SQLite-Verbindung für einen Aufruf (Transaktion wie 'with conn', danach geschlossen)"""
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            conn.executescript(SQLITE_CONNECTION_PRAGMAS)
+            with conn:
+                yield conn
+    
+    def _enable_sqlite_wal(self):
+        """Schaltet die SQLite-Datei einmalig auf WAL (persistent, gilt für alle späteren Verbindungen)"""
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.Error as e:
+            logger.warning(f"SQLite WAL mode not enabled: {e}")
+    
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Liefert das Embedding einer Such-Query, wiederholte Queries ohne erneutes encode"""
+        key = hashlib.blake2b(_normalize_query(query).encode('utf-8'), digest_size=16).digest()
+        with self._query_emb_cache_lock:
+            embedding = self._query_emb_cache.get(key)
+            if embedding is not None:
+                self._query_emb_cache.move_to_end(key)
+                return embedding
+        
+        # Encode außerhalb des Locks, damit parallele Suchen sich nicht blockieren
+        embedding = self.embedding_model.encode(
+            [query], convert_to_numpy=True, normalize_embeddings=True, show_progress_bar=False
+        )[0].astype(np.float32, copy=False)
+        embedding.setflags(write=False)
+        with self._query_emb_cache_lock:
+            self._query_emb_cache[key] = embedding
+            self._query_emb_cache.move_to_end(key)
+            while len(self._query_emb_cache) > QUERY_EMBEDDING_CACHE_MAX_ENTRIES:
+                self._query_emb_cache.popitem(last=False)
+        return embedding
+    
     def _validate_file(self, file_path: str, filename: str) -> bool:
         """Validiert Datei-Upload mit robuster Type-Safety"""
         try:
@@ -258,6 +530,29 @@ class KnowledgeManager:
             logger.error(f"File validation error: {e}")
             return False
     
+    def _hash_file(self, file_path: str) -> str:
+        """blake2b-Hash des Dateiinhalts (32 Hex-Zeichen), blockweise gelesen"""
+        file_hash = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(FILE_HASH_BLOCK_SIZE), b''):
+                file_hash.update(block)
+        return file_hash.hexdigest()
+    
+    def _find_processed_upload(self, project_id: int, content_hash: str) -> Optional[Tuple[str, int]]:
+        """Liefert (doc_id, chunks_count) einer bereits verarbeiteten Datei mit gleichem Inhalt im Projekt"""
+        try:
+            with self._db() as conn:
+                row = conn.execute('''
+                    SELECT doc_id, chunks_count FROM uploaded_files
+                    WHERE project_id = ? AND content_hash = ? AND processed = TRUE AND doc_id IS NOT NULL
+                    LIMIT 1
+                ''', (project_id, content_hash)).fetchone()
+            return (row[0], row[1] or 0) if row else None
+        except sqlite3.Error as e:
+            # z.B. Spalte content_hash noch nicht migriert: normal weiterverarbeiten
+            logger.warning(f"Upload deduplication lookup failed: {e}")
+            return None
+    
     def _extract_text(self, file_path: str, filename: str) -> str:
         """
         Extrahiert Text aus verschiedenen Dateiformaten mit Type-Safety
@@ -302,65 +597,90 @@ class KnowledgeManager:
     
     def _extract_from_pdf(self, file_path: str) -> str:
         """Extrahiert Text aus PDF-Datei mit robuster Error-Handling"""
+        if _PDFIUM_AVAILABLE:
+            try:
+                return self._extract_from_pdf_pdfium(file_path)
+            except Exception as e:
+                logger.warning(f"⚠️ pypdfium2 extraction failed, falling back to PyPDF2: {e}")
+        
         try:
-            text = ""
+            page_texts = []
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 for page in pdf_reader.pages:
                     page_text = page.extract_text()
                     if page_text:  # Skip empty pages
-                        text += page_text + "\n"
-            return text
+                        page_texts.append(page_text + "\n")
+            return "".join(page_texts)
         except Exception as e:
             logger.error(f"PDF extraction error: {e}")
             return ""
     
+    def _extract_from_pdf_pdfium(self, file_path: str) -> str:
+        """Extrahiert PDF-Text mit PDFium (Seiten nacheinander, PDFium ist nicht threadsicher)"""
+        pdf = pdfium.PdfDocument(file_path)
+        try:
+            page_texts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                try:
+                    # PDFium liefert CRLF-Zeilenenden, wie bei PyPDF2 auf \n vereinheitlichen
+                    page_text = textpage.get_text_range().replace('\r\n', '\n')
+                finally:
+                    textpage.close()
+                    page.close()
+                if page_text:  # Skip empty pages
+                    page_texts.append(page_text + "\n")
+            return "".join(page_texts)
+        finally:
+            pdf.close()
+    
     def _extract_from_docx(self, file_path: str) -> str:
         """Extrahiert Text aus DOCX-Datei mit Paragraph-Handling"""
         try:
             doc = docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():  # Skip empty paragraphs
-                    text += paragraph.text + "\n"
-            return text
+            # Direkt über die w:p-Elemente des Bodys (wie doc.paragraphs, aber ohne Paragraph-Wrapper pro Absatz)
+            parts = [text for text in (p.text for p in doc.element.body.p_lst) if text.strip()]  # Skip empty paragraphs
+            return "\n".join(parts) + "\n" if parts else ""
         except Exception as e:
             logger.error(f"DOCX extraction error: {e}")
             return ""
     
     def _chunk_text(self, text: str) -> List[str]:
-        """Intelligente Text-Segmentierung"""
+        """
+        Intelligente Text-Segmentierung
+        PERFORMANCE: Satzgrenzen per Regex, Chunk-Grenzen per np.cumsum/np.searchsorted statt Stringaufbau pro Satz
+        """
         try:
             if not text.strip():
                 return []
             
-            # Simple sentence-aware chunking
-            sentences = text.replace('\n', ' ').split('. ')
-            chunks = []
-            current_chunk = ""
-            
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                    
-                # Add sentence to current chunk
-                test_chunk = current_chunk + ". " + sentence if current_chunk else sentence
-                
-                if len(test_chunk) <= self.chunk_size:
-                    current_chunk = test_chunk
-                else:
-                    # Save current chunk and start new one
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = sentence
-            
-            # Add final chunk
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
+            # Sentence-aware chunking (Satzgrenzen nach '.', '!' und '?')
+            sentences = [sentence for sentence in _SENTENCE_SPLIT_RE.split(text.replace('\n', ' ').strip()) if sentence]
+            if not sentences:
+                return []
             
-            # Ensure minimum quality chunks
-            quality_chunks = [chunk for chunk in chunks if len(chunk.strip()) > 50]
+            # cum[i] = Länge der ersten i Sätze inkl. je einem Trennzeichen; Chunk [a, b) hat Länge cum[b] - cum[a] - 1
+            lens = np.fromiter((len(sentence) + 1 for sentence in sentences), dtype=np.int64, count=len(sentences))
+            cum = np.concatenate(([0], np.cumsum(lens)))
+            
+            bounds = []
+            start = 0
+            while start < len(sentences):
+                # Größtes Ende, bei dem der Chunk noch in chunk_size passt (mindestens ein Satz pro Chunk)
+                end = int(np.searchsorted(cum, cum[start] + self.chunk_size + 1, side='right')) - 1
+                end = max(end, start + 1)
+                bounds.append((start, end))
+                start = end
+            
+            # Ensure minimum quality chunks (Längen direkt aus den Summen, ohne Chunks zu bauen)
+            bounds_arr = np.array(bounds, dtype=np.int64)
+            chunk_lens = cum[bounds_arr[:, 1]] - cum[bounds_arr[:, 0]] - 1
+            quality_chunks = [
+                ' '.join(sentences[a:b])
+                for (a, b), keep in zip(bounds, chunk_lens > 50)
+                if keep
+            ]
             
             logger.info(f"Text chunking: {len(quality_chunks)} chunks created")
             return quality_chunks
@@ -369,14 +689,20 @@ class KnowledgeManager:
             logger.error(f"Text chunking error: {e}")
             return []
     
-    def _generate_embeddings(self, chunks: List[str]) -> Optional[List[List[float]]]:
-        """Generiert Embeddings für Text-Chunks"""
+    def _generate_embeddings(self, chunks: List[str]) -> Optional[np.ndarray]:
+        """Generiert Embeddings für Text-Chunks als float32-Array der Form (n, dim), L2-normalisiert"""
         try:
             if not self.embedding_model:
                 logger.error("Embedding model not initialized")
                 return None
             
-            embeddings = self.embedding_model.encode(chunks).tolist()
+            embeddings = self.embedding_model.encode(
+                chunks,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype(np.float32, copy=False)
             logger.info(f"Generated {len(embeddings)} embeddings")
             return embeddings
             
@@ -384,57 +710,109 @@ class KnowledgeManager:
             logger.error(f"Embedding generation error: {e}")
             return None
     
-    def _store_in_vector_db(self, collection_name: str, chunks: List[str], embeddings: List[List[float]], filename: str) -> str:
-        """Speichert Chunks und Embeddings in ChromaDB"""
+    def _embed_and_store(self, collection_name: str, chunks: List[str], filename: str) -> Optional[str]:
+        """
+        PERFORMANCE: Pipeline aus Embedding und Vector-Store. Während Batch k in ChromaDB geschrieben wird
+        (Store-Thread), läuft bereits das Embedding von Batch k+1.
+        
+        Returns:
+            doc_id, oder None wenn die Embedding-Generierung fehlschlägt
+        """
         try:
-            # Get or create collection
-            try:
-                collection = self.chroma_client.get_collection(collection_name)
-            except:
-                collection = self.chroma_client.create_collection(collection_name)
-            
-            # Create unique IDs and metadata
-            doc_id = hashlib.md5(f"{filename}_{datetime.now()}".encode()).hexdigest()[:12]
-            
-            ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
-            metadatas = [
-                {
-                    'filename': filename,
-                    'chunk_id': i,
-                    'doc_id': doc_id,
-                    'created_at': datetime.now().isoformat()
-                }
-                for i in range(len(chunks))
-            ]
-            
-            # Store in ChromaDB
-            collection.add(
-                documents=chunks,
-                embeddings=embeddings,
-                metadatas=metadatas,
-                ids=ids
-            )
-            
-            logger.info(f"✅ Stored {len(chunks)} chunks in vector DB (collection: {collection_name})")
-            return doc_id
-            
+            collection, doc_id, created_at = self._prepare_vector_store(collection_name, filename)
+        except Exception as e:
+            logger.error(f"Vector DB storage error: {e}")
+            raise
+        
+        pending = None
+        try:
+            for offset in range(0, len(chunks), VECTOR_STORE_PIPELINE_BATCH):
+                batch = chunks[offset:offset + VECTOR_STORE_PIPELINE_BATCH]
+                embeddings = self._generate_embeddings(batch)
+                if embeddings is None:
+                    if pending is not None:
+                        # Bereits geschriebene Batches des abgebrochenen Dokuments wieder entfernen
+                        self._discard_document(collection, doc_id, pending)
+                    return None
+                # Höchstens ein Batch gleichzeitig im Store (Fehler des vorherigen Batches hier weiterreichen)
+                if pending is not None:
+                    pending.result()
+                pending = _vector_store_pool.submit(
+                    self._add_chunks_to_collection, collection, doc_id, created_at, filename, batch, embeddings, offset
+                )
+            if pending is not None:
+                pending.result()
         except Exception as e:
             logger.error(f"Vector DB storage error: {e}")
+            # Wie vor dem Pipelining: ein fehlgeschlagener Store hinterlässt keine Teil-Dokumente
+            self._discard_document(collection, doc_id, pending)
             raise
+        
+        logger.info(f"✅ Stored {len(chunks)} chunks in vector DB (collection: {collection_name})")
+        return doc_id
+    
+    def _discard_document(self, collection, doc_id: str, pending) -> None:
+        """Wartet den laufenden Store-Batch ab und entfernt alle Chunks des Dokuments aus der Collection"""
+        if pending is not None:
+            wait([pending])
+        try:
+            collection.delete(where={'doc_id': doc_id})
+        except Exception as e:
+            logger.error(f"Vector DB cleanup error for doc_id {doc_id}: {e}")
+    
+    def _prepare_vector_store(self, collection_name: str, filename: str) -> Tuple[Any, str, str]:
+        """Holt oder erstellt die Collection und erzeugt doc_id und Zeitstempel für ein Dokument"""
+        # Get or create collection
+        try:
+            collection = self.chroma_client.get_collection(collection_name)
+        except:
+            collection = self.chroma_client.create_collection(collection_name, metadata=HNSW_COLLECTION_METADATA)
+        
+        # Create unique IDs and metadata
+        # blake2b (wie der Query-Embedding-Cache) statt MD5, Zeitstempel in Nanosekunden
+        doc_id = hashlib.blake2b(f"{filename}|{time.time_ns()}".encode(), digest_size=6).hexdigest()
+        
+        # Zeitstempel einmal pro Dokument statt pro Chunk
+        created_at = datetime.now().isoformat()
+        return collection, doc_id, created_at
+    
+    def _add_chunks_to_collection(self, collection, doc_id: str, created_at: str, filename: str,
+                                  chunks: List[str], embeddings: np.ndarray, offset: int) -> None:
+        """Schreibt Chunks ab Position offset (chunk_id = offset + i) in die Collection"""
+        chunk_range = range(offset, offset + len(chunks))
+        ids = [f"{doc_id}_chunk_{i}" for i in chunk_range]
+        metadatas = [
+            {
+                'filename': filename,
+                'chunk_id': i,
+                'doc_id': doc_id,
+                'created_at': created_at
+            }
+            for i in chunk_range
+        ]
+        
+        # Store in ChromaDB (chromadb 0.4 validiert Listen aus Python-floats, daher erst hier konvertieren)
+        collection.add(
+            documents=chunks,
+            embeddings=embeddings.tolist(),
+            metadatas=metadatas,
+            ids=ids
+        )
     
     def _update_file_database(self, file_info: Dict[str, Any]):
         """Aktualisiert SQL-Datenbank mit File-Informationen"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     UPDATE uploaded_files 
-                    SET processed = ?, chunks_count = ?, doc_id = ?
+                    SET processed = ?, chunks_count = ?, doc_id = ?, content_hash = ?
                     WHERE project_id = ? AND filename = ?
                 ''', (
                     file_info['processed'],
                     file_info['chunks_count'],
                     file_info['doc_id'],
+                    file_info['content_hash'],
                     file_info['project_id'],
                     file_info['filename']
                 ))
@@ -444,8 +822,8 @@ class KnowledgeManager:
                     # Insert new record if update didn't affect any rows
                     cursor.execute('''
                         INSERT INTO uploaded_files 
-                        (project_id, user_id, filename, file_path, file_type, file_size, processed, chunks_count, doc_id)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        (project_id, user_id, filename, file_path, file_type, file_size, processed, chunks_count, doc_id, content_hash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     ''', (
                         file_info['project_id'],
                         file_info['user_id'],
@@ -455,7 +833,8 @@ class KnowledgeManager:
                         os.path.getsize(file_info['file_path']),
                         file_info['processed'],
                         file_info['chunks_count'],
-                        file_info['doc_id']
+                        file_info['doc_id'],
+                        file_info['content_hash']
                     ))
                     conn.commit()
                     
@@ -465,12 +844,26 @@ class KnowledgeManager:
 
 # Global instance for app integration
 knowledge_manager = None
+_knowledge_manager_lock = threading.Lock()
+
+def _reset_knowledge_manager_lock() -> None:
+    """Nach fork() frischer Lock im Kind-Prozess (ein beim Fork gehaltener Lock würde dort nie freigegeben)"""
+    global _knowledge_manager_lock
+    _knowledge_manager_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_knowledge_manager_lock)
 
 def get_knowledge_manager():
-    """Singleton pattern for KnowledgeManager"""
+    """
+    Singleton pattern for KnowledgeManager
+    Double-Checked Locking: parallele Requests laden Embedding-Model und ChromaDB nur einmal
+    """
     global knowledge_manager
     if knowledge_manager is None:
-        knowledge_manager = KnowledgeManager()
+        with _knowledge_manager_lock:
+            if knowledge_manager is None:
+                knowledge_manager = KnowledgeManager()
     return knowledge_manager
 
 # Knowledge lookup tool for orchestrator
@@ -478,7 +871,18 @@ def knowledge_lookup(query: str, project_id: int, context: str = "") -> str:
     """
     Tool-Funktion für Orchestrator
     Führt semantische Suche durch und formatiert Ergebnisse
+    (Treffer werden pro Projekt und Query gecacht; context fließt nicht in die Suche ein)
     """
+    cache_key = (str(project_id), query)
+    now = time.monotonic()
+    with _knowledge_cache_lock:
+        cached = _knowledge_cache.get(cache_key)
+        if cached is not None:
+            if cached[0] > now:
+                _knowledge_cache.move_to_end(cache_key)
+                return cached[1]
+            del _knowledge_cache[cache_key]
+    
     try:
         km = get_knowledge_manager()
         results = km.search_knowledge(query, project_id, top_k=3)
@@ -496,6 +900,13 @@ def knowledge_lookup(query: str, project_id: int, context: str = "") -> str:
         
         formatted_response += "---\n*Diese Informationen wurden aus der hochgeladenen Wissensbasis extrahiert.*"
         
+        # Nur echte Treffer cachen (keine Fehler- oder Leer-Antworten)
+        with _knowledge_cache_lock:
+            _knowledge_cache[cache_key] = (now + KNOWLEDGE_CACHE_TTL_SECONDS, formatted_response)
+            _knowledge_cache.move_to_end(cache_key)
+            while len(_knowledge_cache) > KNOWLEDGE_CACHE_MAX_ENTRIES:
+                _knowledge_cache.popitem(last=False)
+        
         return formatted_response
         
     except Exception as e:
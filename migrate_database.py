@@ -11,7 +11,9 @@ from datetime import datetime
 # Add the current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from sqlalchemy import inspect
 from app_simplified import app, db, User
+from init_assistants import DEFAULT_USERS
 from werkzeug.security import generate_password_hash
 
 logging.basicConfig(level=logging.INFO)
@@ -24,37 +26,35 @@ def migrate_database():
         with app.app_context():
             logger.info("🔄 Starting database migration...")
             
-            # Drop all tables first (for clean migration)
-            logger.info("Dropping existing tables...")
-            db.drop_all()
+            # Destruktiver Neuaufbau nur auf ausdrücklichen Wunsch (löscht alle Daten!)
+            if os.environ.get("KIKI_RESET_DB") == "1":
+                logger.warning("⚠️ KIKI_RESET_DB=1 - dropping existing tables...")
+                db.drop_all()
             
-            # Create all tables
-            logger.info("Creating all tables...")
-            db.create_all()
-            logger.info("✅ All tables created successfully")
+            # Idempotent: create_all legt nur fehlende Tabellen an, bestehende Daten bleiben erhalten
+            existing_tables = set(inspect(db.engine).get_table_names())
+            missing_tables = [table.name for table in db.metadata.sorted_tables if table.name not in existing_tables]
+            if missing_tables:
+                logger.info(f"Creating missing tables: {', '.join(missing_tables)}")
+                db.create_all()
+                logger.info("✅ Missing tables created successfully")
+            else:
+                logger.info("✅ All tables already exist - nothing to create")
             
-            # Create default users
+            # Create default users (ein SELECT für alle, Passwort-Hash nur für neue User)
             logger.info("Creating default users...")
-            
-            # Admin user
-            if not User.query.filter_by(username='admin').first():
-                admin_user = User(
-                    username='admin',
-                    password_hash=generate_password_hash('admin123'),
-                    role='admin'
-                )
-                db.session.add(admin_user)
-                logger.info("✅ Admin user created (admin/admin123)")
-            
-            # Demo user  
-            if not User.query.filter_by(username='demo').first():
-                demo_user = User(
-                    username='demo',
-                    password_hash=generate_password_hash('demo123'),
-                    role='user'
-                )
-                db.session.add(demo_user)
-                logger.info("✅ Demo user created (demo/demo123)")
+            existing_users = set(db.session.execute(
+                db.select(User.username).where(User.username.in_([username for username, _, _ in DEFAULT_USERS]))
+            ).scalars())
+            for username, password, role in DEFAULT_USERS:
+                if username in existing_users:
+                    continue
+                db.session.add(User(
+                    username=username,
+                    password_hash=generate_password_hash(password),
+                    role=role
+                ))
+                logger.info(f"✅ {username.capitalize()} user created ({username}/{password})")
             
             # Commit all changes
             db.session.commit()
@@ -62,7 +62,6 @@ def migrate_database():
             
             # Verify tables exist
             logger.info("Verifying tables...")
-            from sqlalchemy import inspect
             inspector = inspect(db.engine)
             tables = inspector.get_table_names()
             expected_tables = ['user', 'project', 'chat_session', 'chat_message', 'uploaded_file', 'course']
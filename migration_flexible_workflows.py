@@ -10,6 +10,15 @@ from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# PERFORMANCE: Einmalige Migration braucht keine fsyncs pro Statement - Pragmas gelten nur für deren Dauer
+# (journal_mode/locking_mode brauchen exklusiven Dateizugriff und stehen deshalb am Ende)
+MIGRATION_PRAGMAS = (
+    "PRAGMA synchronous=OFF",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA journal_mode=MEMORY",
+    "PRAGMA locking_mode=EXCLUSIVE",
+)
+
 def migrate_to_flexible_workflows(db_path='instance/app.db'):
     """
     Migrates database to support flexible workflow system:
@@ -23,6 +32,20 @@ def migrate_to_flexible_workflows(db_path='instance/app.db'):
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
+        # Ursprüngliche Einstellungen merken, damit sie am Ende wiederhergestellt werden
+        original_journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+        original_synchronous = cursor.execute("PRAGMA synchronous").fetchone()[0]
+        for pragma in MIGRATION_PRAGMAS:
+            try:
+                cursor.execute(pragma)
+            except sqlite3.OperationalError as e:
+                # Offene Fremdverbindungen (z.B. laufende App im WAL-Modus) - ohne exklusiven Modus weitermachen
+                print(f"ℹ️ Skipping remaining migration pragmas ({pragma}): {e}")
+                break
+        
+        # Gesamte Migration in einer exklusiven Transaktion
+        conn.execute("BEGIN EXCLUSIVE")
+        
         print("🔄 Starting migration to flexible workflow system...")
         
         # 1. Add assistant_type to assistants table (if not exists)
@@ -58,24 +81,30 @@ def migrate_to_flexible_workflows(db_path='instance/app.db'):
         # 4. Create default assistant-to-role mappings for existing workflow steps
         print("🔄 Creating default assistant mappings...")
         
-        # Get all assistants with roles
-        cursor.execute("SELECT id, role FROM assistants WHERE role IS NOT NULL")
-        assistant_role_map = {role: assistant_id for assistant_id, role in cursor.fetchall()}
-        
-        # Update workflow_steps with assistant_id based on agent_role
-        cursor.execute("SELECT id, agent_role FROM workflow_steps WHERE assistant_id IS NULL")
-        steps_to_update = cursor.fetchall()
-        
-        for step_id, agent_role in steps_to_update:
-            if agent_role in assistant_role_map:
-                assistant_id = assistant_role_map[agent_role]
-                cursor.execute(
-                    "UPDATE workflow_steps SET assistant_id = ? WHERE id = ?",
-                    (assistant_id, step_id)
-                )
-                print(f"✅ Mapped step {step_id} ({agent_role}) to assistant {assistant_id}")
-            else:
-                print(f"⚠️ No assistant found for role '{agent_role}' in step {step_id}")
+        # Rolle -> Assistant-Mapping als temporäre Tabelle (bei doppelter Rolle gewinnt die letzte Zeile)
+        cursor.execute("CREATE TEMP TABLE _role_map (role TEXT PRIMARY KEY, assistant_id INTEGER)")
+        cursor.execute("INSERT OR REPLACE INTO _role_map (role, assistant_id) SELECT role, id FROM assistants WHERE role IS NOT NULL ORDER BY rowid")
+        
+        # Warnung für Steps ohne passenden Assistant (vor dem Update ermitteln)
+        cursor.execute("""
+            SELECT id, agent_role FROM workflow_steps
+            WHERE assistant_id IS NULL
+              AND (agent_role IS NULL OR agent_role NOT IN (SELECT role FROM _role_map))
+        """)
+        unmapped_steps = cursor.fetchall()
+        
+        # PERFORMANCE: Ein korreliertes UPDATE statt einem UPDATE pro Step
+        cursor.execute("""
+            UPDATE workflow_steps
+            SET assistant_id = (SELECT assistant_id FROM _role_map WHERE _role_map.role = workflow_steps.agent_role)
+            WHERE assistant_id IS NULL AND agent_role IN (SELECT role FROM _role_map)
+        """)
+        print(f"✅ Mapped {cursor.rowcount} steps to assistants by agent_role")
+        
+        for step_id, agent_role in unmapped_steps:
+            print(f"⚠️ No assistant found for role '{agent_role}' in step {step_id}")
+        
+        cursor.execute("DROP TABLE _role_map")
         
         # 5. Set default values for new columns
         cursor.execute("UPDATE assistants SET assistant_type = 'system' WHERE role IN ('supervisor', 'content_creator', 'didactic_expert', 'quality_checker')")
@@ -113,8 +142,20 @@ def migrate_to_flexible_workflows(db_path='instance/app.db'):
         raise
     finally:
         if 'conn' in locals():
+            if 'original_journal_mode' in locals():
+                _restore_pragmas(conn, original_journal_mode, original_synchronous)
             conn.close()
 
+def _restore_pragmas(conn, journal_mode, synchronous):
+    """Setzt die Migrations-Pragmas auf die ursprünglichen Werte zurück"""
+    try:
+        conn.execute("PRAGMA locking_mode=NORMAL")
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.execute(f"PRAGMA synchronous={int(synchronous)}")
+        conn.execute("PRAGMA temp_store=DEFAULT")
+    except sqlite3.Error as e:
+        print(f"⚠️ Could not restore SQLite pragmas: {e}")
+
 def rollback_migration(db_path='instance/app.db'):
     """
     Rollback migration (limited due to SQLite constraints)
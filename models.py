@@ -3,59 +3,157 @@ SQLAlchemy Database Models für Intelligentes KI-Kursstudio
 Unterstützt sowohl SQLite (lokal) als auch PostgreSQL (Railway)
 """
 
-from datetime import datetime
+import enum
+import json
+import threading
+import time
+from types import SimpleNamespace
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event, inspect
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import deferred
+from sqlalchemy.types import TypeDecorator, TEXT
 
 db = SQLAlchemy()
 
-class User(db.Model):
+# PERFORMANCE: Freiraum pro Page für Tabellen mit häufigen updated_at-Updates (HOT-Updates ohne Index-Pflege).
+# Voraussetzung: updated_at ist in keinem Index enthalten. Nur PostgreSQL, gesetzt per DDL nach CREATE TABLE
+HOT_UPDATE_FILLFACTOR = 80
+
+# Zeilen pro Statement bei Bulk-Inserts (SQLAlchemy teilt intern zusätzlich in insertmanyvalues-Pages auf)
+BULK_INSERT_BATCH_SIZE = 10000
+
+DEFAULT_ENABLED_TOOLS = ["create_content", "optimize_didactics", "critically_review", "request_user_feedback", "knowledge_lookup"]
+
+class JSONType(TypeDecorator):
+    """
+    JSON-Spalte: natives JSONB auf PostgreSQL (Parsing serverseitig, GIN-indexierbar),
+    JSON-Text als Fallback auf SQLite. Python-seitig immer list/dict.
+    """
+    impl = TEXT
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        return dialect.type_descriptor(JSONB() if dialect.name == 'postgresql' else TEXT())
+    
+    def process_bind_param(self, value, dialect):
+        if dialect.name == 'postgresql' or value is None:
+            return value
+        return json.dumps(value)
+    
+    def process_result_value(self, value, dialect):
+        if dialect.name == 'postgresql':
+            return value
+        return json.loads(value) if value else None
+
+# Enum-artige Spalten mit festem Wertebereich. str-Enums: Vergleiche mit Strings ('chapter') funktionieren weiter
+class Sender(str, enum.Enum):
+    user = 'user'
+    assistant = 'assistant'
+
+class AssistantType(str, enum.Enum):
+    custom = 'custom'
+    system = 'system'
+    workflow = 'workflow'
+
+class StepType(str, enum.Enum):
+    assistant_call = 'assistant_call'
+    condition = 'condition'
+    delay = 'delay'
+
+class SectionType(str, enum.Enum):
+    chapter = 'chapter'
+    exercise = 'exercise'
+    summary = 'summary'
+
+def _enum_column_type(enum_cls):
+    """VARCHAR in Länge des längsten Werts + CHECK-Constraint, gespeichert wird der Wert (nicht der Name)"""
+    return db.Enum(
+        enum_cls,
+        name=f"{enum_cls.__name__.lower()}_enum",
+        native_enum=False,
+        create_constraint=True,
+        values_callable=lambda members: [member.value for member in members],
+    )
+
+class ServerDefaultsMixin:
+    """Serverseitige Defaults (Timestamps) direkt per RETURNING beim INSERT/UPDATE abholen statt per Nach-SELECT"""
+    __mapper_args__ = {'eager_defaults': True}
+
+class BulkInsertMixin:
+    """Multi-Row-INSERT ohne ORM-Unit-of-Work für Tabellen mit vielen Zeilen pro Request"""
+    
+    @classmethod
+    def bulk_insert(cls, session, rows, batch_size=BULK_INSERT_BATCH_SIZE):
+        """Fügt rows (Liste von Spalten-Dicts) per executemany/insertmanyvalues ein"""
+        for start in range(0, len(rows), batch_size):
+            session.execute(db.insert(cls), rows[start:start + batch_size])
+
+class User(ServerDefaultsMixin, db.Model):
     __tablename__ = 'users'
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(20), default='user')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
     last_login = db.Column(db.DateTime)
 
-class Project(db.Model):
+class Project(ServerDefaultsMixin, db.Model):
     __tablename__ = 'projects'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     status = db.Column(db.String(20), default='active')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
 
-class ChatSession(db.Model):
+class ChatSession(ServerDefaultsMixin, db.Model):
     __tablename__ = 'chat_sessions'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), index=True)
     title = db.Column(db.String(200), default='New Chat')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    
+    # Löschen kaskadiert in der DB (ON DELETE CASCADE) - Kinder werden dafür nicht geladen
+    messages = db.relationship('ChatMessage', back_populates='session', cascade='all, delete-orphan',
+                               passive_deletes=True, order_by='ChatMessage.created_at')
 
-class ChatMessage(db.Model):
+class ChatMessage(ServerDefaultsMixin, BulkInsertMixin, db.Model):
     __tablename__ = 'chat_messages'
+    # Chat-Verlauf einer Session chronologisch (deckt auch Lookups nur nach session_id ab)
+    __table_args__ = (
+        db.Index('ix_chat_messages_session_created', 'session_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
-    sender = db.Column(db.String(50), nullable=False)  # 'user' or 'assistant'
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_sessions.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), index=True)
+    sender = db.Column(_enum_column_type(Sender), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    
+    session = db.relationship('ChatSession', back_populates='messages')
 
-class UploadedFile(db.Model):
+# BRIN-Index für Zeitfenster-Abfragen auf dem append-only Chat-Verlauf (Bruchteil der B-Tree-Größe) - nur PostgreSQL
+event.listen(
+    ChatMessage.__table__,
+    'after_create',
+    DDL("CREATE INDEX IF NOT EXISTS ix_chat_messages_created_brin ON chat_messages USING brin (created_at) WITH (pages_per_range = 32)").execute_if(dialect='postgresql')
+)
+
+class UploadedFile(ServerDefaultsMixin, BulkInsertMixin, db.Model):
     __tablename__ = 'uploaded_files'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_type = db.Column(db.String(50), nullable=False)
@@ -64,10 +162,15 @@ class UploadedFile(db.Model):
     chunks_count = db.Column(db.Integer, default=0)
     embedding_model = db.Column(db.String(100))
     collection_name = db.Column(db.String(100))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
 
-class Assistant(db.Model):
+class Assistant(ServerDefaultsMixin, db.Model):
     __tablename__ = 'assistants'
+    # Partielle Indizes (PostgreSQL und SQLite): nur die Zeilen des dominanten Filters landen im Index
+    __table_args__ = (
+        db.Index('ix_assistants_active_order', 'order_index',
+                 postgresql_where=db.text('is_active'), sqlite_where=db.text('is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -80,7 +183,7 @@ class Assistant(db.Model):
     order_index = db.Column(db.Integer, default=0)
     
     # NEW: Assistant type categorization (optional)
-    assistant_type = db.Column(db.String(50), default='custom')  # custom, system, workflow
+    assistant_type = db.Column(_enum_column_type(AssistantType), default=AssistantType.custom)
     
     # Advanced behavior parameters
     temperature = db.Column(db.Float, default=0.7)
@@ -103,13 +206,27 @@ class Assistant(db.Model):
     custom_system_message = db.Column(db.Text)
     
     # Tool configuration
-    enabled_tools = db.Column(db.Text, default='["create_content","optimize_didactics","critically_review","request_user_feedback","knowledge_lookup"]')
+    enabled_tools = db.Column(JSONType, default=DEFAULT_ENABLED_TOOLS)
+    
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Rückrichtung bleibt lazy: Assistant-Abfragen sollen nicht alle Steps mitladen
+    workflow_steps = db.relationship('WorkflowStep', back_populates='assistant', order_by='WorkflowStep.order_index')
 
-class Workflow(db.Model):
+# GIN-Index für Tool-Filter (z.B. enabled_tools @> '["knowledge_lookup"]') - nur PostgreSQL/JSONB
+event.listen(
+    Assistant.__table__,
+    'after_create',
+    DDL("CREATE INDEX IF NOT EXISTS ix_assistant_tools_gin ON assistants USING gin (enabled_tools)").execute_if(dialect='postgresql')
+)
+
+class Workflow(ServerDefaultsMixin, db.Model):
     __tablename__ = 'workflows'
+    __table_args__ = (
+        db.Index('ix_workflows_default', 'id',
+                 postgresql_where=db.text('is_default AND is_active'), sqlite_where=db.text('is_default AND is_active')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -117,18 +234,27 @@ class Workflow(db.Model):
     workflow_type = db.Column(db.String(50), default='course_creation')
     is_active = db.Column(db.Boolean, default=True)
     is_default = db.Column(db.Boolean, default=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    
+    steps = db.relationship('WorkflowStep', back_populates='workflow', cascade='all, delete-orphan',
+                            passive_deletes=True, order_by='WorkflowStep.order_index')
+    executions = db.relationship('WorkflowExecution', back_populates='workflow', cascade='all, delete-orphan',
+                                 passive_deletes=True)
 
 class WorkflowStep(db.Model):
     __tablename__ = 'workflow_steps'
+    # Steps eines Workflows in Ausführungsreihenfolge (deckt auch Lookups nur nach workflow_id ab)
+    __table_args__ = (
+        db.Index('ix_workflow_steps_wf_order', 'workflow_id', 'order_index'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    workflow_id = db.Column(db.Integer, db.ForeignKey('workflows.id'), nullable=False)
+    workflow_id = db.Column(db.Integer, db.ForeignKey('workflows.id', ondelete='CASCADE'), nullable=False)
     
     # NEW FLEXIBLE SYSTEM: Direct assistant assignment
-    assistant_id = db.Column(db.Integer, db.ForeignKey('assistants.id'), nullable=False)
+    assistant_id = db.Column(db.Integer, db.ForeignKey('assistants.id'), nullable=False, index=True)
     
     # LEGACY SUPPORT: Keep agent_role for backward compatibility (nullable)
     agent_role = db.Column(db.String(50), nullable=True)
@@ -147,32 +273,46 @@ class WorkflowStep(db.Model):
     custom_prompt = db.Column(db.Text)
     
     # NEW: Step type for different execution modes
-    step_type = db.Column(db.String(50), default='assistant_call')  # assistant_call, condition, delay
+    step_type = db.Column(_enum_column_type(StepType), default=StepType.assistant_call)
     
     # Relationship to get assistant details
-    assistant = db.relationship('Assistant', backref='workflow_steps')
+    # PERFORMANCE: selectin lädt die Assistants aller Steps mit einer IN-Query statt einer Query pro Step (N+1)
+    assistant = db.relationship('Assistant', lazy='selectin', back_populates='workflow_steps')
+    workflow = db.relationship('Workflow', back_populates='steps')
 
-class WorkflowExecution(db.Model):
+class WorkflowExecution(ServerDefaultsMixin, db.Model):
     __tablename__ = 'workflow_executions'
+    # Offene Executions sind selten - Index enthält nur diese
+    __table_args__ = (
+        db.Index('ix_workflow_executions_pending', 'started_at',
+                 postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    workflow_id = db.Column(db.Integer, db.ForeignKey('workflows.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    workflow_id = db.Column(db.Integer, db.ForeignKey('workflows.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     status = db.Column(db.String(20), default='pending')
-    input_data = db.Column(db.Text)
-    output_data = db.Column(db.Text)
+    # PERFORMANCE: Große Payloads erst beim Zugriff laden (Listen von Executions lesen sie nicht)
+    input_data = deferred(db.Column(JSONType))
+    output_data = deferred(db.Column(JSONType))
     error_message = db.Column(db.Text)
-    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
     completed_at = db.Column(db.DateTime)
     execution_time_seconds = db.Column(db.Integer)
+    
+    workflow = db.relationship('Workflow', back_populates='executions')
 
-class Course(db.Model):
+class Course(ServerDefaultsMixin, db.Model):
     __tablename__ = 'courses'
+    __table_args__ = (
+        db.Index('ix_courses_published', 'user_id', 'published_at',
+                 postgresql_where=db.text("status = 'published'"), sqlite_where=db.text("status = 'published'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'))
-    workflow_execution_id = db.Column(db.Integer, db.ForeignKey('workflow_executions.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), index=True)
+    workflow_execution_id = db.Column(db.Integer, db.ForeignKey('workflow_executions.id', ondelete='SET NULL'), index=True)
     
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -181,33 +321,97 @@ class Course(db.Model):
     estimated_duration = db.Column(db.String(100))
     
     # Course content
-    full_content = db.Column(db.Text)  # Complete course text
+    full_content = deferred(db.Column(db.Text))  # Complete course text (erst beim Zugriff geladen)
     outline = db.Column(db.Text)       # Course outline/structure
-    learning_objectives = db.Column(db.Text)  # JSON list of objectives
+    learning_objectives = db.Column(JSONType)  # List of objectives
     
     # Status and metadata
-    status = db.Column(db.String(20), default='draft')  # draft, published, archived
+    status = db.Column(db.String(20), default='draft', index=True)  # draft, published, archived
     quality_score = db.Column(db.Float)
     content_length = db.Column(db.Integer)  # Character count
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
     published_at = db.Column(db.DateTime)
+    
+    sections = db.relationship('CourseSection', back_populates='course', cascade='all, delete-orphan',
+                               passive_deletes=True, order_by='CourseSection.section_order')
 
-class CourseSection(db.Model):
+class CourseSection(ServerDefaultsMixin, BulkInsertMixin, db.Model):
     __tablename__ = 'course_sections'
+    # Abschnitte eines Kurses in Reihenfolge (deckt auch Lookups nur nach course_id ab)
+    __table_args__ = (
+        db.Index('ix_course_sections_course_order', 'course_id', 'section_order'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id', ondelete='CASCADE'), nullable=False)
     
     section_title = db.Column(db.String(200), nullable=False)
     section_content = db.Column(db.Text)
     section_order = db.Column(db.Integer, nullable=False)
-    section_type = db.Column(db.String(50), default='chapter')  # chapter, exercise, summary
+    section_type = db.Column(_enum_column_type(SectionType), default=SectionType.chapter)
     
-    learning_objectives = db.Column(db.Text)  # JSON list for this section
+    learning_objectives = db.Column(JSONType)  # List for this section
     estimated_duration = db.Column(db.String(50))
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    
+    course = db.relationship('Course', back_populates='sections')
+
+# Fillfactor für Tabellen mit häufigen updated_at-Updates (HOT-Updates) - nur PostgreSQL
+for _model in (Project, ChatSession, Assistant, Workflow, Course):
+    event.listen(
+        _model.__table__,
+        'after_create',
+        DDL(f"ALTER TABLE %(table)s SET (fillfactor = {HOT_UPDATE_FILLFACTOR})").execute_if(dialect='postgresql')
+    )
+
+# PERFORMANCE: Prozessweiter TTL-Cache für Assistant-/Workflow-Lookups per Primärschlüssel (Hot Path pro Chat-Turn).
+# Gecacht werden schreibgeschützte Spalten-Snapshots statt ORM-Objekten - unabhängig von Session und Commit-Expiry.
+LOOKUP_CACHE_TTL_SECONDS = 60
+LOOKUP_CACHE_MAX_ENTRIES = 512
+_lookup_cache: dict = {}  # (Modell, Primärschlüssel) -> (expires_at, Snapshot)
+_lookup_cache_lock = threading.Lock()
+
+def _column_snapshot(obj) -> SimpleNamespace:
+    """Kopiert alle Spaltenwerte eines ORM-Objekts (Attributzugriff wie am Modell)"""
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+def _cached_lookup(model, pk):
+    """Snapshot der Zeile pk aus dem Cache oder per Query (None wenn nicht vorhanden, Fehlschläge werden nicht gecacht)"""
+    key = (model.__name__, pk)
+    now = time.monotonic()
+    with _lookup_cache_lock:
+        cached = _lookup_cache.get(key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+    
+    obj = db.session.get(model, pk)
+    if obj is None:
+        return None
+    snapshot = _column_snapshot(obj)
+    with _lookup_cache_lock:
+        if len(_lookup_cache) >= LOOKUP_CACHE_MAX_ENTRIES:
+            _lookup_cache.clear()
+        _lookup_cache[key] = (now + LOOKUP_CACHE_TTL_SECONDS, snapshot)
+    return snapshot
+
+def get_assistant(assistant_pk):
+    """Assistant-Daten per Primärschlüssel (gecacht, read-only)"""
+    return _cached_lookup(Assistant, assistant_pk)
+
+def get_workflow(workflow_pk):
+    """Workflow-Daten per Primärschlüssel (gecacht, read-only)"""
+    return _cached_lookup(Workflow, workflow_pk)
+
+def _invalidate_lookup_cache(mapper, connection, target):
+    """Entfernt eine geänderte Zeile aus dem Lookup-Cache (ORM-Schreibzugriffe dieses Prozesses)"""
+    with _lookup_cache_lock:
+        _lookup_cache.pop((type(target).__name__, target.id), None)
+
+for _model in (Assistant, Workflow):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _invalidate_lookup_cache)
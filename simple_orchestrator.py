@@ -10,6 +10,7 @@ Unterstützte Assistenten:
 """
 
 import os
+import re
 import json
 import time
 import logging
@@ -23,6 +24,16 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Abschluss-Indikatoren als eine vorkompilierte Alternation (ein Durchlauf über die Antwort)
+_COMPLETION_RE = re.compile('|'.join(map(re.escape, (
+    "Kurs wurde erfolgreich erstellt",
+    "Der Kurs ist jetzt bereit",
+    "Kurserstellung abgeschlossen",
+    "Ihr Kurs ist fertig",
+    "Der komplette Kurs",
+    "# "  # Likely a markdown course title
+))))
+
 # ==============================================
 # OPENAI CLIENT & ASSISTANT CONFIGURATION
 # ==============================================
@@ -608,16 +619,7 @@ Führe eine kritische Qualitätsprüfung durch und gib das Ergebnis im JSON-Form
     
     def _is_course_creation_complete(self, response: str) -> bool:
         """Check if the response indicates course creation is complete"""
-        completion_indicators = [
-            "Kurs wurde erfolgreich erstellt",
-            "Der Kurs ist jetzt bereit",
-            "Kurserstellung abgeschlossen",
-            "Ihr Kurs ist fertig",
-            "Der komplette Kurs",
-            "# " # Likely a markdown course title
-        ]
-        
-        return any(indicator in response for indicator in completion_indicators)
+        return _COMPLETION_RE.search(response) is not None
     
     def _save_course_to_database(self, content: str) -> Optional[int]:
         """Save the created course to database"""